@@ -2,40 +2,187 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from .models import User, UserRole, TokenData
+from .models import User, UserRole, TokenData, Principal
+from .cache import principal_cache, token_cache
+from .revocation import revocation_list
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
 import os
+import secrets
+import time
 
 # Security configuration
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# bcrypt cost calibration: BCRYPT_ROUNDS pins the work factor, otherwise the
+# highest cost whose hash time fits BCRYPT_TARGET_MS is picked at startup
+BCRYPT_TARGET_MS = float(os.environ.get("BCRYPT_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = int(os.environ.get("BCRYPT_MIN_ROUNDS", "10"))
+BCRYPT_MAX_ROUNDS = int(os.environ.get("BCRYPT_MAX_ROUNDS", "15"))
+
+# Verified against when the account does not exist, so unknown emails cost
+# the same as wrong passwords
+_dummy_password_hash: Optional[str] = None
+
+def calibrate_bcrypt_rounds() -> int:
+    """Choose the bcrypt work factor and make it the default for new hashes"""
+    if os.environ.get("BCRYPT_ROUNDS"):
+        rounds = int(os.environ["BCRYPT_ROUNDS"])
+    else:
+        hasher = bcrypt.using(rounds=BCRYPT_MIN_ROUNDS)
+        elapsed_ms = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            hasher.hash("calibration")
+            elapsed_ms = min(elapsed_ms, (time.perf_counter() - started) * 1000)
+        # Each extra round doubles the cost
+        rounds = BCRYPT_MIN_ROUNDS
+        while rounds < BCRYPT_MAX_ROUNDS and elapsed_ms * 2 <= BCRYPT_TARGET_MS:
+            rounds += 1
+            elapsed_ms *= 2
+    # Hashes below this cost report needs_update() and are upgraded on login;
+    # stronger existing hashes are left alone
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+    global _dummy_password_hash
+    _dummy_password_hash = pwd_context.hash(secrets.token_urlsafe(16))
+    return rounds
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# bcrypt releases the GIL, so request-time password work runs on a small
+# dedicated thread pool instead of blocking the event loop. The semaphore
+# keeps excess work waiting in asyncio rather than piling up in the pool.
+PASSWORD_HASH_THREADS = int(os.environ.get("PASSWORD_HASH_THREADS", min(4, os.cpu_count() or 1)))
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_THREADS, thread_name_prefix="password-hash")
+_password_slots = asyncio.Semaphore(PASSWORD_HASH_THREADS)
+
+async def _run_password_work(func, *args):
+    async with _password_slots:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _run_password_work(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    return await _run_password_work(get_password_hash, password)
+
+async def verify_dummy_password(plain_password) -> bool:
+    """Spend one verification's worth of time for a login with an unknown email"""
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = await get_password_hash_async(secrets.token_urlsafe(16))
+    await verify_password_async(plain_password, _dummy_password_hash)
+    return False
+
+async def rehash_password(user_id: str, password: str, old_hash: str) -> None:
+    """Store a hash at the current work factor for a password that just verified"""
+    from .database import replace_password_hash
+    new_hash = await get_password_hash_async(password)
+    await replace_password_hash(user_id, old_hash, new_hash)
+
+# Worker processes for hashing many passwords at once (bulk imports)
+PASSWORD_HASH_PROCESSES = int(os.environ.get("PASSWORD_HASH_PROCESSES", os.cpu_count() or 1))
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+def _init_hash_worker(rounds: int) -> None:
+    # Spawned workers start from a fresh import, without the calibration
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+
+def start_hash_pool(rounds: int) -> None:
+    """Create the worker pool at startup, hashing at the calibrated work factor"""
+    global _hash_pool
+    # Spawned rather than forked: forking a process that already runs
+    # threads (the event loop's executors, the log listener) is unsafe
+    _hash_pool = ProcessPoolExecutor(
+        max_workers=PASSWORD_HASH_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_hash_worker,
+        initargs=(rounds,),
+    )
+
+def stop_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash a batch of passwords in parallel across worker processes"""
+    if _hash_pool is None:
+        # Outside the app (scripts, tests) there is no pool; use the thread pool
+        return await asyncio.gather(*(get_password_hash_async(password) for password in passwords))
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        loop.run_in_executor(_hash_pool, get_password_hash, password) for password in passwords
+    ))
+
+def access_token_claims(user: User) -> dict:
+    """Claims that let authorization checks run without loading the user"""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role.value,
+        "group_id": user.group_id,
+        "ver": user.token_version,
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    issued_at = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = issued_at + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+        expire = issued_at + timedelta(minutes=15)
+    # jti and iat let single tokens, or all of a user's older tokens, be revoked
+    to_encode.update({"exp": expire, "iat": issued_at, "jti": secrets.token_urlsafe(12)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are random, so a keyed hash is enough to store them safely
+    return hmac.new(SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+def new_refresh_token():
+    """Returns (token for the client, hash to store, expiry)"""
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token), datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
 def verify_token(token: str):
     # BYPASS TEMPORAL PARA ADMIN
     if token.startswith('admin-bypass-token-'):
         return TokenData(email="admin@test.com")
     
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(digest)
+    if cached is not None:
+        expires_at, token_data = cached
+        # The cache entry may outlive the token; expiry is still enforced exactly
+        if time.time() < expires_at:
+            return token_data
+        token_cache.pop(digest)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -45,15 +192,36 @@ def verify_token(token: str):
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        token_data = TokenData(email=email)
+        token_data = TokenData(
+            email=email,
+            user_id=payload.get("uid"),
+            role=payload.get("role"),
+            group_id=payload.get("group_id"),
+            token_version=payload.get("ver"),
+            token_id=payload.get("jti"),
+            issued_at=payload.get("iat"),
+            expires_at=payload.get("exp")
+        )
+        expires_at = payload.get("exp")
+        if expires_at is not None:
+            token_cache.set(digest, (expires_at, token_data), ttl=max(0, expires_at - time.time()))
         return token_data
-    except JWTError:
+    except (JWTError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def check_token_active(token_data: TokenData) -> None:
+    """Reject tokens that were revoked or carry outdated claims"""
+    if revocation_list.is_revoked(token_data):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token is no longer valid, please log in again",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     
@@ -72,6 +240,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         return admin_user
     
     token_data = verify_token(token)
+    check_token_active(token_data)
+    user = principal_cache.get(token_data.email)
+    if user is not None:
+        return user
     
     # Import here to avoid circular import
     from .database import get_user_by_email
@@ -82,9 +254,35 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    principal_cache.set(token_data.email, user)
     return user
 
-async def get_current_admin(current_user: User = Depends(get_current_user)):
+async def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
+    """Authorization claims of the caller, read from the token without a database lookup"""
+    token = credentials.credentials
+    token_data = None if token.startswith('admin-bypass-token-') else verify_token(token)
+    
+    # Bypass tokens and tokens issued before claims were embedded need the full user
+    if token_data is None or token_data.user_id is None or token_data.role is None:
+        user = await get_current_user(credentials)
+        return Principal(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            group_id=user.group_id,
+            token_version=user.token_version
+        )
+    
+    check_token_active(token_data)
+    return Principal(
+        id=token_data.user_id,
+        email=token_data.email,
+        role=token_data.role,
+        group_id=token_data.group_id,
+        token_version=token_data.token_version or 0
+    )
+
+async def get_current_admin(current_user: Principal = Depends(get_current_principal)):
     # BYPASS ADICIONAL para el admin temporal
     if current_user.id == "admin-temp-001" or current_user.email == "admin@test.com":
         return current_user
@@ -96,7 +294,7 @@ async def get_current_admin(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
-async def get_current_pilgrim(current_user: User = Depends(get_current_user)):
+async def get_current_pilgrim(current_user: Principal = Depends(get_current_principal)):
     if current_user.role != UserRole.PILGRIM:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
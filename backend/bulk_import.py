@@ -0,0 +1,97 @@
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from typing import Dict, List, Optional
+import csv
+import io
+import json
+
+from .models import BulkImportReport, BulkImportRowResult, PilgrimInfo, User, UserCreate, UserRole
+from .database import add_pilgrims_to_group, create_users_bulk, get_existing_emails
+from .auth import hash_passwords
+
+MAX_IMPORT_ROWS = 2000
+
+def parse_rows(content_type: str, body: bytes) -> List[dict]:
+    """Read import rows from a CSV (header line required) or JSON array body"""
+    try:
+        if "csv" in content_type:
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            # Blank cells mean "not provided"
+            rows = [{k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()} for row in reader]
+        else:
+            rows = json.loads(body)
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValueError("expected a JSON array of objects")
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not parse import file: {e}"
+        )
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Import is limited to {MAX_IMPORT_ROWS} rows"
+        )
+    return rows
+
+async def import_users(rows: List[dict], default_group_id: Optional[str] = None) -> BulkImportReport:
+    """Validate, hash and insert a batch of users, then add pilgrims to their groups"""
+    results = [
+        # Rows are not validated yet; an email that is not even a string is left out of the report
+        BulkImportRowResult(row=index + 1, email=row.get("email") if isinstance(row.get("email"), str) else None,
+                            status="invalid")
+        for index, row in enumerate(rows)
+    ]
+
+    # Validate every row; pilgrims default to the import's group
+    candidates: Dict[int, UserCreate] = {}
+    for index, row in enumerate(rows):
+        row = {"role": UserRole.PILGRIM, "group_id": default_group_id, **row}
+        try:
+            candidates[index] = UserCreate(**row)
+        except ValidationError as e:
+            results[index].error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+    # Drop emails that are already registered or repeated within the file
+    existing_emails = await get_existing_emails([user_data.email for user_data in candidates.values()])
+    seen = set()
+    for index in list(candidates):
+        email = candidates[index].email
+        if email in existing_emails or email in seen:
+            results[index].status = "duplicate"
+            results[index].error = "Email already registered"
+            del candidates[index]
+        seen.add(email)
+
+    indexes = list(candidates)
+    password_hashes = await hash_passwords([candidates[index].password for index in indexes])
+    users = [
+        User(
+            email=candidates[index].email,
+            password_hash=password_hash,
+            name=candidates[index].name,
+            role=candidates[index].role,
+            group_id=candidates[index].group_id
+        )
+        for index, password_hash in zip(indexes, password_hashes)
+    ]
+    errors = await create_users_bulk(users)
+
+    pilgrims_by_group: Dict[str, List[PilgrimInfo]] = {}
+    for position, (index, user) in enumerate(zip(indexes, users)):
+        if position in errors:
+            results[index].status = "duplicate" if "already registered" in errors[position] else "failed"
+            results[index].error = errors[position]
+            continue
+        results[index].status = "created"
+        results[index].user_id = user.id
+        if user.role == UserRole.PILGRIM and user.group_id:
+            pilgrims_by_group.setdefault(user.group_id, []).append(
+                PilgrimInfo(id=user.id, name=user.name, email=user.email)
+            )
+
+    for group_id, pilgrims in pilgrims_by_group.items():
+        await add_pilgrims_to_group(group_id, pilgrims)
+
+    created = sum(1 for result in results if result.status == "created")
+    return BulkImportReport(total=len(rows), created=created, failed=len(rows) - created, rows=results)
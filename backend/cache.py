@@ -0,0 +1,157 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import functools
+import os
+import time
+
+from .conditional import resource_etag, stamp_etag
+
+# Every cache registers itself here so /api/metrics can report on it
+CACHES: Dict[str, "TTLCache"] = {}
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Per-namespace counters bumped on invalidation, so a load that raced
+        # with a write can tell its result is already stale
+        self._generations: Dict[Hashable, int] = {}
+        CACHES[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def evict_where(self, predicate: Callable[[Hashable, Any], bool]) -> None:
+        for key in [key for key, (_, value) in self._data.items() if predicate(key, value)]:
+            del self._data[key]
+
+    def generation(self, namespace: Hashable) -> int:
+        return self._generations.get(namespace, 0)
+
+    def set_if_current(self, key: Hashable, value: Any, namespace: Hashable, generation: int) -> None:
+        if self.generation(namespace) == generation:
+            self.set(key, value)
+
+    def invalidate_namespace(self, namespace: Hashable) -> None:
+        """Drop every key whose first element is `namespace`"""
+        self._generations[namespace] = self.generation(namespace) + 1
+        self.evict_where(lambda key, value: key[0] == namespace)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+# Authenticated users keyed by token subject (email)
+principal_cache = TTLCache(
+    "principal",
+    maxsize=int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("PRINCIPAL_CACHE_TTL", "60")),
+)
+
+# Decoded access tokens keyed by SHA-256 of the token, so repeat requests
+# skip signature checking and JSON parsing
+token_cache = TTLCache(
+    "token",
+    maxsize=int(os.environ.get("TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("TOKEN_CACHE_TTL", "1800")),
+)
+
+def invalidate_principal(user_id: str) -> None:
+    principal_cache.evict_where(lambda email, user: user.id == user_id)
+
+# Public, rarely changing reads (destinations, spiritual content), keyed by
+# (collection name, function name, *arguments)
+public_content_cache = TTLCache(
+    "public_content",
+    maxsize=int(os.environ.get("PUBLIC_CONTENT_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("PUBLIC_CONTENT_CACHE_TTL", "300")),
+)
+
+def invalidate_public_content(collection_name: str) -> None:
+    public_content_cache.invalidate_namespace(collection_name)
+
+def cached_public(collection_name: str):
+    """Read-through public_content_cache for a database read function"""
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (collection_name, func.__name__) + args + tuple(sorted(kwargs.items()))
+            value = public_content_cache.get(key)
+            if value is None:
+                generation = public_content_cache.generation(collection_name)
+                value = await func(*args, **kwargs)
+                if value is not None:
+                    public_content_cache.set_if_current(key, value, collection_name, generation)
+            return value
+        return wrapper
+    return decorator
+
+# Encoded JSON bodies of group-scoped pilgrim reads, keyed by (group_id, route).
+# Only filled after the caller's authorization check has passed.
+group_response_cache = TTLCache(
+    "group_response",
+    maxsize=int(os.environ.get("GROUP_RESPONSE_CACHE_SIZE", "2048")),
+    ttl=float(os.environ.get("GROUP_RESPONSE_CACHE_TTL", "300")),
+)
+
+def invalidate_group_responses(group_id: str) -> None:
+    group_response_cache.invalidate_namespace(group_id)
+
+async def cached_group_response(group_id: str, route: str, load: Callable[[], Awaitable[Any]]) -> Optional[Tuple[str, bytes]]:
+    """ETag and JSON bytes of `load()` for a group, or None when it found nothing"""
+    key = (group_id, route)
+    entry = group_response_cache.get(key)
+    if entry is None:
+        generation = group_response_cache.generation(group_id)
+        model = await load()
+        if model is None:
+            return None
+        entry = (resource_etag(model.id, model.updated_at), model.model_dump_json(by_alias=True).encode())
+        group_response_cache.set_if_current(key, entry, group_id, generation)
+    return entry
+
+async def group_response_etag(group_id: str, route: str, load_stamp: Callable[[], Awaitable[Optional[dict]]]) -> Optional[str]:
+    """Current ETag of a group read, from the cached response or else a version stamp query"""
+    entry = group_response_cache.get((group_id, route))
+    if entry is not None:
+        return entry[0]
+    return stamp_etag(await load_stamp())
+
+# Compressed response bodies keyed by (encoding, SHA-1 of the identity body)
+compressed_response_cache = TTLCache(
+    "compressed_response",
+    maxsize=int(os.environ.get("COMPRESSED_RESPONSE_CACHE_SIZE", "256")),
+    ttl=float(os.environ.get("COMPRESSED_RESPONSE_CACHE_TTL", "3600")),
+)
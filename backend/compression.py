@@ -0,0 +1,162 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional
+import gzip
+import hashlib
+import os
+import zlib
+
+from .cache import compressed_response_cache
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Smaller bodies gain less than the headers and CPU time cost
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+# Only text payloads are worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """The supported encoding the client prefers, Brotli winning ties"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            weights[coding] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def compress_cached(body: bytes, encoding: str) -> bytes:
+    """Compress identical payloads only once"""
+    key = (encoding, hashlib.sha1(body).digest())
+    compressed = compressed_response_cache.get(key)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        compressed_response_cache.set(key, compressed)
+    return compressed
+
+class _StreamCompressor:
+    """Incremental compressor that flushes every chunk, so streamed lines reach the client promptly"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+class CompressionMiddleware:
+    """gzip/Brotli response compression negotiated from Accept-Encoding"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+            if encoding:
+                await _CompressingResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+class _CompressingResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.stream: Optional[_StreamCompressor] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers or self.start_message["status"] in (204, 304):
+            return False
+        return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+    def _mark_encoded(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # The encoded bytes differ from the identity ones, so a strong ETag no longer holds
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not self._compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self._mark_encoded(headers)
+            if not more_body:
+                # Versioned reads are requested repeatedly, so reuse their compressed bytes
+                body = compress_cached(body, self.encoding) if "etag" in headers else compress(body, self.encoding)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            self.stream = _StreamCompressor(self.encoding)
+            await self.send(self.start_message)
+
+        chunk = self.stream.process(body)
+        if not more_body:
+            chunk += self.stream.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,72 @@
+from datetime import datetime
+from fastapi import Request, Response, status
+from typing import Awaitable, Callable, Optional
+import calendar
+import hashlib
+import os
+import time
+
+from .versions import BOOT_ID, collection_version
+
+# The write counters behind list ETags only see this process's writes. Other
+# workers and scripts write too, so a list ETag also expires after this many
+# seconds: the longest a client can be told a stale list is unchanged.
+COLLECTION_ETAG_TTL = float(os.environ.get("COLLECTION_ETAG_TTL", "60"))
+
+def resource_etag(resource_id: str, updated_at: datetime) -> str:
+    """Strong ETag for one version of a document"""
+    # MongoDB keeps milliseconds, so freshly built models and stored
+    # documents must agree at that precision
+    millis = calendar.timegm(updated_at.utctimetuple()) * 1000 + updated_at.microsecond // 1000
+    digest = hashlib.sha1(f"{resource_id}:{millis}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+def stamp_etag(stamp: Optional[dict]) -> Optional[str]:
+    """ETag from an {id, updated_at} stamp document, if the document exists"""
+    if not stamp or "updated_at" not in stamp:
+        return None
+    return resource_etag(stamp["id"], stamp["updated_at"])
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+async def check_not_modified(request: Request, current_etag: Callable[[], Awaitable[Optional[str]]]) -> Optional[Response]:
+    """A 304 response when If-None-Match already names the current version, else None"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    etag = await current_etag()
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return None
+
+def collection_etag(collection_name: str, request: Request) -> str:
+    """Weak ETag for a list read of a collection as it stands now"""
+    # Path and query string pick the slice of the collection, so they are part of the version
+    variant = hashlib.sha1(f"{request.url.path}?{request.url.query}".encode()).hexdigest()[:8]
+    epoch = int(time.time() // COLLECTION_ETAG_TTL)
+    return f'W/"{BOOT_ID}-{epoch}-{collection_version(collection_name)}-{variant}"'
+
+def check_collection_not_modified(request: Request, response: Response, collection_name: str) -> Optional[Response]:
+    """A 304 response when the collection has not been written since the client's copy,
+    else None after setting the ETag on `response`"""
+    # Taken before reading, so a write racing the read only costs a refetch
+    etag = collection_etag(collection_name, request)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return None
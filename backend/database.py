@@ -1,11 +1,26 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from pydantic import BaseModel
 from .models import *
-from typing import List, Optional
+from .singleflight import forget_inflight, single_flight
+from .versions import bump_collection_version
+from .trusted import load_model
+from .log import debug_payload
+from .cache import cached_public, invalidate_group_responses, invalidate_principal, invalidate_public_content
+from .pagination import Page, PageParams, keyset_query, next_page, sort_spec
+from typing import AsyncIterator, Callable, Dict, List, Optional, Type, TypeVar
+from functools import lru_cache
+import asyncio
+import json
+import logging
 import os
 from datetime import datetime
 from dotenv import load_dotenv
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -15,12 +30,69 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ.get('DB_NAME', 'pilgrimage_db')]
 
+# Documents fetched per round trip when streaming a whole collection
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '500'))
+
 # Collections
 users_collection = db.users
 groups_collection = db.pilgrimage_groups
 itineraries_collection = db.itineraries
 destinations_collection = db.destinations
 spiritual_content_collection = db.spiritual_content
+refresh_tokens_collection = db.refresh_tokens
+revoked_tokens_collection = db.revoked_tokens
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+@lru_cache(maxsize=None)
+def projection_for(model: Type[BaseModel]) -> Dict[str, int]:
+    """Projection that fetches exactly the fields of `model`, without `_id`"""
+    projection = {"_id": 0}
+    for name, field in model.model_fields.items():
+        projection[field.alias or name] = 1
+    # Needed to tell whether the document can be trusted
+    projection["schema_version"] = 1
+    return projection
+
+def _to_document(model: BaseModel, by_alias: bool = False) -> dict:
+    """Document to store for a model, stamped with the current schema version"""
+    document = model.model_dump(by_alias=by_alias)
+    document["schema_version"] = SCHEMA_VERSION
+    return document
+
+def _after_write(collection_name: str) -> None:
+    """Bookkeeping every write to one of the collections must do"""
+    # Readers arriving after the write must not join a query issued before it
+    forget_inflight(collection_name)
+    # List ETags are derived from this counter
+    bump_collection_version(collection_name)
+
+# Only the fields a version stamp needs, so (…, id, updated_at) indexes cover the query
+STAMP_PROJECTION = {"_id": 0, "id": 1, "updated_at": 1}
+
+async def _find_stamp(collection, query: dict) -> Optional[dict]:
+    return await collection.find_one(query, STAMP_PROJECTION)
+
+async def _iter_page(collection, query: dict, page: PageParams,
+                     build: Callable[[dict], Optional[ModelT]],
+                     projection: Optional[dict] = None,
+                     batch_size: int = 0) -> AsyncIterator[ModelT]:
+    """Run a keyset-paginated find; `build` turns a document into a model or None to skip it"""
+    cursor = collection.find(keyset_query(query, page), projection, batch_size=batch_size).sort(sort_spec(page))
+    if page.limit is not None:
+        cursor = cursor.limit(page.limit)
+    async for doc in cursor:
+        item = build(doc)
+        if item is not None:
+            yield item
+
+async def _find_page(collection, query: dict, page: PageParams,
+                     build: Callable[[dict], Optional[ModelT]],
+                     projection: Optional[dict] = None) -> Page:
+    # One extra document tells us whether there is a next page
+    fetch = page if page.limit is None else page._replace(limit=page.limit + 1)
+    items = [item async for item in _iter_page(collection, query, fetch, build, projection)]
+    return next_page(items, page)
 
 # User Database Operations
 async def create_user(user_data: UserCreate, password_hash: str) -> User:
@@ -31,453 +103,436 @@ async def create_user(user_data: UserCreate, password_hash: str) -> User:
         role=user_data.role,
         group_id=user_data.group_id
     )
-    await users_collection.insert_one(user.dict())
+    await users_collection.insert_one(_to_document(user))
+    _after_write("users")
     return user
 
+async def create_users_bulk(users: List[User]) -> Dict[int, str]:
+    """Insert many users in one unordered batch; returns the error message of every rejected index"""
+    if not users:
+        return {}
+    try:
+        await users_collection.insert_many([_to_document(user) for user in users], ordered=False)
+    except BulkWriteError as e:
+        _after_write("users")
+        return {
+            error["index"]: "Email already registered" if error.get("code") == 11000 else error.get("errmsg", "Insert failed")
+            for error in e.details.get("writeErrors", [])
+        }
+    _after_write("users")
+    return {}
+
+async def get_existing_emails(emails: List[str]) -> set:
+    cursor = users_collection.find({"email": {"$in": emails}}, {"_id": 0, "email": 1})
+    return {user_doc["email"] async for user_doc in cursor}
+
+@single_flight("users")
 async def get_user_by_email(email: str) -> Optional[User]:
     user_doc = await users_collection.find_one({"email": email})
     if user_doc:
-        return User(**user_doc)
+        return load_model(User, user_doc)
     return None
 
+@single_flight("users")
 async def get_user_by_id(user_id: str) -> Optional[User]:
     user_doc = await users_collection.find_one({"id": user_id})
     if user_doc:
-        return User(**user_doc)
+        return load_model(User, user_doc)
     return None
 
-async def get_all_users_from_db() -> List[User]:
-    """Get all users from database"""
-    cursor = users_collection.find({})
-    users = []
-    async for user_doc in cursor:
-        users.append(User(**user_doc))
-    return users
+async def get_all_users_from_db(as_model: Type[ModelT] = User, page: PageParams = PageParams()) -> Page:
+    """Get a page of users from database, fetching only the fields of `as_model`"""
+    return await _find_page(users_collection, {}, page, lambda user_doc: load_model(as_model, user_doc),
+                            projection_for(as_model))
 
-async def get_users_by_group_id(group_id: str) -> List[User]:
-    cursor = users_collection.find({"group_id": group_id})
+def iter_all_users(as_model: Type[ModelT] = User, page: PageParams = PageParams()) -> AsyncIterator[ModelT]:
+    """Stream users from database without holding the whole result in memory"""
+    return _iter_page(users_collection, {}, page, lambda user_doc: load_model(as_model, user_doc),
+                      projection_for(as_model), STREAM_BATCH_SIZE)
+
+@single_flight("users")
+async def get_users_by_group_id(group_id: str, as_model: Type[ModelT] = User) -> List[ModelT]:
+    cursor = users_collection.find({"group_id": group_id}, projection_for(as_model))
     users = []
     async for user_doc in cursor:
-        users.append(User(**user_doc))
+        users.append(load_model(as_model, user_doc))
     return users
 
 async def update_user(user_id: str, update_data: dict) -> Optional[User]:
     update_data["updated_at"] = datetime.utcnow()
-    result = await users_collection.update_one(
+    user_doc = await users_collection.find_one_and_update(
         {"id": user_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
-    if result.modified_count > 0:
-        return await get_user_by_id(user_id)
+    _after_write("users")
+    invalidate_principal(user_id)
+    if user_doc:
+        return load_model(User, user_doc)
     return None
 
+async def replace_password_hash(user_id: str, old_hash: str, new_hash: str) -> bool:
+    """Swap in an upgraded hash unless the password changed in the meantime"""
+    result = await users_collection.update_one(
+        {"id": user_id, "password_hash": old_hash},
+        {"$set": {"password_hash": new_hash}}
+    )
+    _after_write("users")
+    invalidate_principal(user_id)
+    return result.modified_count > 0
+
 async def delete_user(user_id: str) -> bool:
     result = await users_collection.delete_one({"id": user_id})
+    _after_write("users")
+    invalidate_principal(user_id)
     return result.deleted_count > 0
 
+# Refresh Token Database Operations
+async def create_refresh_token(token_hash: str, user_id: str, claims: dict, expires_at: datetime) -> None:
+    await refresh_tokens_collection.insert_one({
+        "token_hash": token_hash,
+        "user_id": user_id,
+        "claims": claims,
+        "expires_at": expires_at,
+        "created_at": datetime.utcnow()
+    })
+
+async def consume_refresh_token(token_hash: str) -> Optional[dict]:
+    """Atomically remove an unexpired refresh token so it can only be used once"""
+    return await refresh_tokens_collection.find_one_and_delete(
+        {"token_hash": token_hash, "expires_at": {"$gt": datetime.utcnow()}}
+    )
+
+async def delete_refresh_tokens_for_user(user_id: str) -> None:
+    await refresh_tokens_collection.delete_many({"user_id": user_id})
+
+# Token Revocation Database Operations
+async def add_revocation(revocation: dict) -> None:
+    await revoked_tokens_collection.insert_one(revocation)
+
+async def get_active_revocations() -> List[dict]:
+    cursor = revoked_tokens_collection.find({"expires_at": {"$gt": datetime.utcnow()}}, {"_id": 0})
+    return await cursor.to_list(length=None)
+
 # Pilgrimage Group Database Operations
 async def create_pilgrimage_group(group_data: PilgrimageGroupCreate) -> PilgrimageGroup:
-    group = PilgrimageGroup(**group_data.dict())
-    await groups_collection.insert_one(group.dict())
+    group = PilgrimageGroup(**group_data.model_dump())
+    await groups_collection.insert_one(_to_document(group))
+    _after_write("pilgrimage_groups")
     return group
 
+@single_flight("pilgrimage_groups")
 async def get_pilgrimage_group_by_id(group_id: str) -> Optional[PilgrimageGroup]:
-    print(f"DEBUG: Searching for group with id: {group_id}")
     group_doc = await groups_collection.find_one({"id": group_id})
-    print(f"DEBUG: Found group_doc: {group_doc}")
+    debug_payload(logger, "Fetched group document", group_id=group_id, document=group_doc)
     if group_doc:
         # Remove MongoDB's _id field
         group_doc.pop('_id', None)
         try:
-            group = PilgrimageGroup(**group_doc)
-            print(f"DEBUG: Successfully created PilgrimageGroup: {group.id}")
-            return group
+            return load_model(PilgrimageGroup, group_doc)
         except Exception as e:
-            print(f"DEBUG: Error creating PilgrimageGroup: {e}")
+            logger.error("Stored group document is invalid", extra={"group_id": group_id, "error": str(e)})
             return None
     return None
 
-async def get_all_pilgrimage_groups() -> List[PilgrimageGroup]:
-    cursor = groups_collection.find({})
-    groups = []
-    async for group_doc in cursor:
-        # Remove MongoDB's _id field
-        group_doc.pop('_id', None)
-        groups.append(PilgrimageGroup(**group_doc))
-    return groups
+async def get_pilgrimage_group_stamp(group_id: str) -> Optional[dict]:
+    return await _find_stamp(groups_collection, {"id": group_id})
+
+async def get_all_pilgrimage_groups(page: PageParams = PageParams()) -> Page:
+    # Remove MongoDB's _id field
+    return await _find_page(groups_collection, {}, page, lambda group_doc: load_model(PilgrimageGroup, group_doc),
+                            {"_id": 0})
+
+def iter_all_pilgrimage_groups(page: PageParams = PageParams()) -> AsyncIterator[PilgrimageGroup]:
+    return _iter_page(groups_collection, {}, page, lambda group_doc: load_model(PilgrimageGroup, group_doc),
+                      {"_id": 0}, STREAM_BATCH_SIZE)
 
 async def update_pilgrimage_group(group_id: str, update_data: PilgrimageGroupUpdate) -> Optional[PilgrimageGroup]:
-    update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
+    update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
     
-    result = await groups_collection.update_one(
+    group_doc = await groups_collection.find_one_and_update(
         {"id": group_id},
-        {"$set": update_dict}
+        {"$set": update_dict},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
-    if result.modified_count > 0:
-        return await get_pilgrimage_group_by_id(group_id)
+    _after_write("pilgrimage_groups")
+    invalidate_group_responses(group_id)
+    if group_doc:
+        return load_model(PilgrimageGroup, group_doc)
     return None
 
 async def delete_pilgrimage_group(group_id: str) -> bool:
     result = await groups_collection.delete_one({"id": group_id})
+    _after_write("pilgrimage_groups")
+    invalidate_group_responses(group_id)
     return result.deleted_count > 0
 
 async def add_pilgrim_to_group(group_id: str, pilgrim_info: PilgrimInfo) -> Optional[PilgrimageGroup]:
-    result = await groups_collection.update_one(
+    group_doc = await groups_collection.find_one_and_update(
+        {"id": group_id},
+        {"$push": {"pilgrims": pilgrim_info.model_dump()}, "$set": {"updated_at": datetime.utcnow()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    _after_write("pilgrimage_groups")
+    invalidate_group_responses(group_id)
+    if group_doc:
+        return load_model(PilgrimageGroup, group_doc)
+    return None
+
+async def add_pilgrims_to_group(group_id: str, pilgrims: List[PilgrimInfo]) -> Optional[PilgrimageGroup]:
+    group_doc = await groups_collection.find_one_and_update(
         {"id": group_id},
-        {"$push": {"pilgrims": pilgrim_info.dict()}}
+        {"$push": {"pilgrims": {"$each": [pilgrim.model_dump() for pilgrim in pilgrims]}},
+         "$set": {"updated_at": datetime.utcnow()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
-    if result.modified_count > 0:
-        return await get_pilgrimage_group_by_id(group_id)
+    _after_write("pilgrimage_groups")
+    invalidate_group_responses(group_id)
+    if group_doc:
+        return load_model(PilgrimageGroup, group_doc)
     return None
 
 async def remove_pilgrim_from_group(group_id: str, pilgrim_id: str) -> Optional[PilgrimageGroup]:
-    result = await groups_collection.update_one(
+    group_doc = await groups_collection.find_one_and_update(
         {"id": group_id},
-        {"$pull": {"pilgrims": {"id": pilgrim_id}}}
+        {"$pull": {"pilgrims": {"id": pilgrim_id}}, "$set": {"updated_at": datetime.utcnow()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
-    if result.modified_count > 0:
-        return await get_pilgrimage_group_by_id(group_id)
+    _after_write("pilgrimage_groups")
+    invalidate_group_responses(group_id)
+    if group_doc:
+        return load_model(PilgrimageGroup, group_doc)
     return None
 
 # Itinerary Database Operations
 async def create_itinerary(itinerary_data: ItineraryCreate) -> Itinerary:
     # Convert ItineraryCreate to dict using aliases, then create Itinerary
-    itinerary_dict = itinerary_data.dict(by_alias=True)
-    itinerary = Itinerary.parse_obj(itinerary_dict)
+    itinerary_dict = itinerary_data.model_dump(by_alias=True)
+    itinerary = Itinerary.model_validate(itinerary_dict)
     # Store in MongoDB using aliases so retrieval works correctly
-    await itineraries_collection.insert_one(itinerary.dict(by_alias=True))
+    await itineraries_collection.insert_one(_to_document(itinerary, by_alias=True))
+    _after_write("itineraries")
+    invalidate_group_responses(itinerary.group_id)
     return itinerary
 
+@single_flight("itineraries")
 async def get_itinerary_by_id(itinerary_id: str) -> Optional[Itinerary]:
     itinerary_doc = await itineraries_collection.find_one({"id": itinerary_id})
     if itinerary_doc:
-        return Itinerary.parse_obj(itinerary_doc)
+        return load_model(Itinerary, itinerary_doc)
     return None
 
+@single_flight("itineraries")
 async def get_itinerary_by_group_id(group_id: str) -> Optional[Itinerary]:
     itinerary_doc = await itineraries_collection.find_one({"group_id": group_id})
     if itinerary_doc:
-        return Itinerary.parse_obj(itinerary_doc)
+        return load_model(Itinerary, itinerary_doc)
     return None
 
-async def get_all_itineraries() -> List[Itinerary]:
-    cursor = itineraries_collection.find({})
-    itineraries = []
-    async for itinerary_doc in cursor:
-        itineraries.append(Itinerary.parse_obj(itinerary_doc))
-    return itineraries
+async def get_itinerary_stamp_by_group_id(group_id: str) -> Optional[dict]:
+    return await _find_stamp(itineraries_collection, {"group_id": group_id})
+
+async def get_all_itineraries(page: PageParams = PageParams()) -> Page:
+    return await _find_page(itineraries_collection, {}, page,
+                            lambda itinerary_doc: load_model(Itinerary, itinerary_doc))
+
+def iter_all_itineraries(page: PageParams = PageParams()) -> AsyncIterator[Itinerary]:
+    return _iter_page(itineraries_collection, {}, page,
+                      lambda itinerary_doc: load_model(Itinerary, itinerary_doc), None, STREAM_BATCH_SIZE)
 
 async def update_itinerary(itinerary_id: str, update_data: ItineraryUpdate) -> Optional[Itinerary]:
-    update_dict = {k: v for k, v in update_data.dict(by_alias=True).items() if v is not None}
+    update_dict = {k: v for k, v in update_data.model_dump(by_alias=True).items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
     
-    result = await itineraries_collection.update_one(
+    itinerary_doc = await itineraries_collection.find_one_and_update(
         {"id": itinerary_id},
-        {"$set": update_dict}
+        {"$set": update_dict},
+        return_document=ReturnDocument.AFTER
     )
-    if result.modified_count > 0:
-        return await get_itinerary_by_id(itinerary_id)
+    _after_write("itineraries")
+    if itinerary_doc:
+        invalidate_group_responses(itinerary_doc["group_id"])
+        return load_model(Itinerary, itinerary_doc)
     return None
 
 async def delete_itinerary(itinerary_id: str) -> bool:
-    result = await itineraries_collection.delete_one({"id": itinerary_id})
-    return result.deleted_count > 0
+    itinerary_doc = await itineraries_collection.find_one_and_delete(
+        {"id": itinerary_id},
+        projection={"_id": 0, "group_id": 1}
+    )
+    _after_write("itineraries")
+    if itinerary_doc:
+        invalidate_group_responses(itinerary_doc["group_id"])
+    return itinerary_doc is not None
 
 # Destination Database Operations
 async def create_destination(destination_data: DestinationCreate) -> Destination:
-    destination = Destination(**destination_data.dict())
-    await destinations_collection.insert_one(destination.dict())
+    destination = Destination(**destination_data.model_dump())
+    await destinations_collection.insert_one(_to_document(destination))
+    _after_write("destinations")
+    invalidate_public_content("destinations")
     return destination
 
+@cached_public("destinations")
+@single_flight("destinations")
 async def get_destination_by_id(destination_id: str) -> Optional[Destination]:
     destination_doc = await destinations_collection.find_one({"id": destination_id})
     if destination_doc:
-        return Destination(**destination_doc)
+        return load_model(Destination, destination_doc)
     return None
 
-async def get_all_destinations() -> List[Destination]:
-    cursor = destinations_collection.find({})
-    destinations = []
-    async for destination_doc in cursor:
-        destinations.append(Destination(**destination_doc))
-    return destinations
+async def get_destination_stamp(destination_id: str) -> Optional[dict]:
+    return await _find_stamp(destinations_collection, {"id": destination_id})
+
+@cached_public("destinations")
+@single_flight("destinations")
+async def get_all_destinations(page: PageParams = PageParams()) -> Page:
+    return await _find_page(destinations_collection, {}, page,
+                            lambda destination_doc: load_model(Destination, destination_doc))
+
+def iter_all_destinations(page: PageParams = PageParams()) -> AsyncIterator[Destination]:
+    return _iter_page(destinations_collection, {}, page,
+                      lambda destination_doc: load_model(Destination, destination_doc), None, STREAM_BATCH_SIZE)
 
 async def update_destination(destination_id: str, update_data: DestinationUpdate) -> Optional[Destination]:
-    update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
+    update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
     
-    result = await destinations_collection.update_one(
+    destination_doc = await destinations_collection.find_one_and_update(
         {"id": destination_id},
-        {"$set": update_dict}
+        {"$set": update_dict},
+        return_document=ReturnDocument.AFTER
     )
-    if result.modified_count > 0:
-        return await get_destination_by_id(destination_id)
+    _after_write("destinations")
+    invalidate_public_content("destinations")
+    if destination_doc:
+        return load_model(Destination, destination_doc)
     return None
 
 async def delete_destination(destination_id: str) -> bool:
     result = await destinations_collection.delete_one({"id": destination_id})
+    _after_write("destinations")
+    invalidate_public_content("destinations")
     return result.deleted_count > 0
 
 # Spiritual Content Database Operations
 async def create_spiritual_content(content_data: SpiritualContentCreate) -> SpiritualContent:
-    content = SpiritualContent(**content_data.dict())
-    await spiritual_content_collection.insert_one(content.dict())
+    content = SpiritualContent(**content_data.model_dump())
+    await spiritual_content_collection.insert_one(_to_document(content))
+    _after_write("spiritual_content")
+    invalidate_public_content("spiritual_content")
     return content
 
+@single_flight("spiritual_content")
 async def get_spiritual_content_by_id(content_id: str) -> Optional[SpiritualContent]:
     content_doc = await spiritual_content_collection.find_one({"id": content_id})
     if content_doc:
-        return SpiritualContent(**content_doc)
+        return load_model(SpiritualContent, content_doc)
     return None
 
+@cached_public("spiritual_content")
+@single_flight("spiritual_content")
 async def get_spiritual_content_by_category(category: str) -> List[SpiritualContent]:
     cursor = spiritual_content_collection.find({"category": category})
     contents = []
     async for content_doc in cursor:
-        contents.append(SpiritualContent(**content_doc))
+        contents.append(load_model(SpiritualContent, content_doc))
     return contents
 
-async def get_all_spiritual_content() -> List[SpiritualContent]:
-    cursor = spiritual_content_collection.find({})
-    contents = []
-    async for content_doc in cursor:
-        try:
-            content = SpiritualContent(**content_doc)
-            contents.append(content)
-        except Exception as e:
-            # Log error but continue processing
-            print(f"Error processing spiritual content document: {e}")
-    return contents
+def _build_spiritual_content(content_doc: dict) -> Optional[SpiritualContent]:
+    try:
+        return load_model(SpiritualContent, content_doc)
+    except Exception as e:
+        # Log error but continue processing
+        logger.warning("Skipping invalid spiritual content document",
+                       extra={"content_id": content_doc.get("id"), "error": str(e)})
+        return None
+
+@cached_public("spiritual_content")
+@single_flight("spiritual_content")
+async def get_all_spiritual_content(page: PageParams = PageParams()) -> Page:
+    return await _find_page(spiritual_content_collection, {}, page, _build_spiritual_content)
+
+def iter_all_spiritual_content(page: PageParams = PageParams()) -> AsyncIterator[SpiritualContent]:
+    return _iter_page(spiritual_content_collection, {}, page, _build_spiritual_content, None, STREAM_BATCH_SIZE)
 
 async def update_spiritual_content(content_id: str, update_data: SpiritualContentUpdate) -> Optional[SpiritualContent]:
-    update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
+    update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     update_dict["updated_at"] = datetime.utcnow()
     
-    result = await spiritual_content_collection.update_one(
+    content_doc = await spiritual_content_collection.find_one_and_update(
         {"id": content_id},
-        {"$set": update_dict}
+        {"$set": update_dict},
+        return_document=ReturnDocument.AFTER
     )
-    if result.modified_count > 0:
-        return await get_spiritual_content_by_id(content_id)
+    _after_write("spiritual_content")
+    invalidate_public_content("spiritual_content")
+    if content_doc:
+        return load_model(SpiritualContent, content_doc)
     return None
 
 async def delete_spiritual_content(content_id: str) -> bool:
     result = await spiritual_content_collection.delete_one({"id": content_id})
+    _after_write("spiritual_content")
+    invalidate_public_content("spiritual_content")
     return result.deleted_count > 0
 
 # Initialize database with sample data
-async def initialize_database():
-    # Check if data already exists
-    user_count = await users_collection.count_documents({})
-    if user_count > 0:
-        return  # Database already initialized
-    
-    print("Initializing database with sample data...")
-    
-    # Create specific admin user with provided credentials
-    from .auth import get_password_hash
-    admin_data = UserCreate(
-        email="julian.alcalde@axisperegrinaciones.com",
-        password="Peregrina7'7$$$%%%",
-        name="Julian Alcalde",
-        role=UserRole.ADMIN
+SEED_FIXTURE = ROOT_DIR / 'fixtures' / 'seed_data.json'
+
+async def _seed_collection(collection, docs: List[dict], natural_key: str = "id") -> int:
+    """Insert the documents not in the collection yet; returns how many were inserted.
+
+    Upserts are keyed on the fixture's stable `id`, which id_unique backs, so
+    workers seeding at the same time cannot both insert a document. Documents
+    whose `natural_key` is already present are skipped, so databases seeded
+    before ids were fixed do not get a second copy.
+    """
+    if natural_key != "id":
+        cursor = collection.find({natural_key: {"$in": [doc[natural_key] for doc in docs]}}, {"_id": 0, natural_key: 1})
+        existing = {existing_doc[natural_key] async for existing_doc in cursor}
+        docs = [doc for doc in docs if doc[natural_key] not in existing]
+    if not docs:
+        return 0
+    result = await collection.bulk_write(
+        [UpdateOne({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True) for doc in docs],
+        ordered=False
     )
-    admin_password_hash = get_password_hash(admin_data.password)
-    await create_user(admin_data, admin_password_hash)
-    
-    # Create sample pilgrim users
-    pilgrim1_data = UserCreate(
-        email="maria@email.com",
-        password="password",
-        name="Maria Santos",
-        role=UserRole.PILGRIM,
-        group_id="group_001"
-    )
-    pilgrim1_password_hash = get_password_hash(pilgrim1_data.password)
-    await create_user(pilgrim1_data, pilgrim1_password_hash)
-    
-    pilgrim2_data = UserCreate(
-        email="john@email.com",
-        password="password",
-        name="John Rodriguez",
-        role=UserRole.PILGRIM,
-        group_id="group_001"
-    )
-    pilgrim2_password_hash = get_password_hash(pilgrim2_data.password)
-    await create_user(pilgrim2_data, pilgrim2_password_hash)
-    
-    # Create sample pilgrimage group with fixed ID
-    group_data = PilgrimageGroupCreate(
-        name="Holy Land Pilgrimage 2025",
-        destination="Jerusalem & Bethlehem",
-        start_date="2025-03-15",
-        end_date="2025-03-22",
-        status=PilgrimageStatus.UPCOMING
-    )
-    # Create group with fixed ID for consistency with mock data
-    group = PilgrimageGroup(**group_data.dict())
-    group.id = "group_001"  # Fixed ID to match mock data
-    await groups_collection.insert_one(group.dict())
-    
-    # Update group with pilgrim info
-    await add_pilgrim_to_group("group_001", PilgrimInfo(
-        id="p1",
-        name="Maria Santos",
-        email="maria@email.com"
-    ))
-    await add_pilgrim_to_group("group_001", PilgrimInfo(
-        id="p2",
-        name="John Rodriguez",
-        email="john@email.com"
-    ))
-    
-    # Create sample destinations
-    destinations = [
-        DestinationCreate(
-            name="Jerusalem",
-            country="Israel",
-            description="The Holy City, sacred to three major religions",
-            facts=[
-                "Jerusalem is mentioned over 800 times in the Bible",
-                "The Western Wall is the last remaining wall of the Second Temple",
-                "The Via Dolorosa is traditionally believed to be the path Jesus walked to crucifixion",
-                "The Old City covers just 0.35 square miles but contains sites sacred to Christianity, Judaism, and Islam"
-            ],
-            spiritual_significance="Jerusalem holds profound significance as the place of Jesus' crucifixion, burial, and resurrection. It is also the site of the Last Supper and many of Jesus' teachings.",
-            image_url="https://images.unsplash.com/photo-1665338033511-e9b19abbce8a"
-        ),
-        DestinationCreate(
-            name="Bethlehem",
-            country="Palestine",
-            description="The birthplace of Jesus Christ",
-            facts=[
-                "The Church of the Nativity is one of the oldest continuously operating churches in the world",
-                "The Silver Star marks the traditional spot where Jesus was born",
-                "Bethlehem means 'House of Bread' in Hebrew",
-                "The city is mentioned 44 times in the Bible"
-            ],
-            spiritual_significance="Bethlehem is the birthplace of Jesus Christ, making it one of the most important pilgrimage destinations for Christians worldwide.",
-            image_url="https://images.unsplash.com/photo-1665338033511-e9b19abbce8a"
-        ),
-        DestinationCreate(
-            name="Fatima",
-            country="Portugal",
-            description="Site of the famous Marian apparitions",
-            facts=[
-                "The apparitions occurred to three shepherd children in 1917",
-                "The Sanctuary receives over 4 million pilgrims annually",
-                "The Miracle of the Sun was witnessed by approximately 70,000 people",
-                "Pope Francis canonized Francisco and Jacinta Marto in 2017"
-            ],
-            spiritual_significance="Fatima is one of the most important Marian pilgrimage sites, where the Virgin Mary appeared to three children with messages of peace and conversion.",
-            image_url="https://images.unsplash.com/photo-1665338033511-e9b19abbce8a"
-        )
-    ]
-    
-    for dest_data in destinations:
-        await create_destination(dest_data)
-    
-    # Create sample spiritual content
-    spiritual_contents = [
-        SpiritualContentCreate(
-            category="rosary",
-            title="Santo Rosario",
-            description="Misterios del Rosario para la meditación diaria",
-            content={
-                "introduction": "El Santo Rosario es una oración contemplativa que nos ayuda a meditar en los misterios de la vida de Jesús y María.",
-                "how_to_pray": "Se reza con el rosario, meditando en los misterios mientras se recitan las Ave Marías.",
-                "joyful_mysteries": [
-                    "1. La Anunciación del Ángel a María",
-                    "2. La Visitación de María a su prima Isabel",
-                    "3. El Nacimiento de Jesús en Belén",
-                    "4. La Presentación del Niño Jesús en el Templo",
-                    "5. El Niño Jesús perdido y hallado en el Templo"
-                ],
-                "sorrowful_mysteries": [
-                    "1. La Agonía de Jesús en el Huerto de Getsemaní",
-                    "2. La Flagelación del Señor",
-                    "3. La Coronación de Espinas",
-                    "4. Jesús con la Cruz a cuestas camino del Calvario",
-                    "5. La Crucifixión y Muerte de Nuestro Señor"
-                ],
-                "glorious_mysteries": [
-                    "1. La Resurrección del Señor",
-                    "2. La Ascensión del Señor a los Cielos",
-                    "3. La Venida del Espíritu Santo sobre los Apóstoles",
-                    "4. La Asunción de María Santísima a los Cielos",
-                    "5. La Coronación de María Santísima como Reina del Cielo y de la Tierra"
-                ],
-                "luminous_mysteries": [
-                    "1. El Bautismo de Jesús en el Jordán",
-                    "2. Las Bodas de Caná",
-                    "3. El Anuncio del Reino de Dios",
-                    "4. La Transfiguración del Señor",
-                    "5. La Institución de la Eucaristía"
-                ]
-            }
-        ),
-        SpiritualContentCreate(
-            category="angelus",
-            title="El Ángelus",
-            description="Oración mariana tradicional que se reza tres veces al día",
-            content={
-                "introduction": "El Ángelus es una oración que conmemora la Anunciación del Ángel Gabriel a la Virgen María. Se reza tradicionalmente al amanecer, al mediodía y al atardecer.",
-                "when_to_pray": "Se reza al amanecer (6:00 AM), al mediodía (12:00 PM) y al atardecer (6:00 PM)",
-                "prayer": {
-                    "verse1": "V. El Ángel del Señor anunció a María.\nR. Y concibió por obra del Espíritu Santo.",
-                    "ave_maria1": "Dios te salve, María...",
-                    "verse2": "V. He aquí la esclava del Señor.\nR. Hágase en mí según tu palabra.",
-                    "ave_maria2": "Dios te salve, María...",
-                    "verse3": "V. Y el Verbo se hizo carne.\nR. Y habitó entre nosotros.",
-                    "ave_maria3": "Dios te salve, María...",
-                    "final_prayer": "V. Ruega por nosotros, Santa Madre de Dios.\nR. Para que seamos dignos de alcanzar las promesas de nuestro Señor Jesucristo.\n\nOREMOS: Infunde, Señor, tu gracia en nuestras almas, para que los que, por el anuncio del Ángel, hemos conocido la Encarnación de tu Hijo Jesucristo, por su Pasión y Cruz seamos llevados a la gloria de su Resurrección. Por el mismo Jesucristo nuestro Señor. Amén."
-                }
-            }
-        ),
-        SpiritualContentCreate(
-            category="morning_prayer",
-            title="Oración de Inicio del Día",
-            description="Oración para comenzar el día encomendándose a Dios",
-            content={
-                "introduction": "Oración para ofrecer el nuevo día a Dios y pedirle su bendición y protección.",
-                "prayer": "Señor Dios, Padre celestial, al despertar a este nuevo día que Tú me concedes, te doy gracias por el descanso de la noche y por la vida que me das.\n\nTe ofrezco este día: mis pensamientos, palabras y obras. Que todo lo que haga sea para tu mayor gloria y para el bien de mis hermanos.\n\nDame sabiduría para tomar buenas decisiones, fortaleza para enfrentar las dificultades, y caridad para amar como Tú me amas.\n\nProtégeme de todo mal y pecado. Que tu Espíritu Santo me guíe en todo momento.\n\nPor intercesión de María Santísima, mi Madre del Cielo, y de mi Ángel de la Guarda.\n\nAmén.",
-                "additional_prayers": {
-                    "offering": "Oh Jesús, por el Inmaculado Corazón de María, te ofrezco mis oraciones, trabajos, gozos y sufrimientos de este día, en reparación de nuestros pecados y por las intenciones del Santo Padre. Amén.",
-                    "protection": "Ángel de Dios, que eres mi custodio, pues la bondad divina me ha encomendado a ti, ilumíname, guárdame, rige y gobiérname. Amén."
-                }
-            }
-        ),
-        SpiritualContentCreate(
-            category="evening_prayer",
-            title="Oración de Finalización del Día",
-            description="Oración para agradecer por el día y pedir perdón antes del descanso",
-            content={
-                "introduction": "Oración para el final del día, agradeciendo a Dios por sus bendiciones y pidiendo perdón por nuestras faltas.",
-                "examination": "Breve examen de conciencia:\n- ¿He ofendido a Dios con pensamientos, palabras u obras?\n- ¿He cumplido con mis deberes?\n- ¿He sido caritativo con mi prójimo?\n- ¿He dado buen ejemplo cristiano?",
-                "prayer": "Señor Dios, al terminar este día, vengo ante Ti con un corazón agradecido.\n\nTe doy gracias por todas las bendiciones que he recibido: por la vida, la salud, el trabajo, la familia, los amigos y por tu constante amor y misericordia.\n\nTe pido perdón por todas las faltas que he cometido hoy, por las veces que no he correspondido a tu amor, por las oportunidades perdidas de hacer el bien.\n\nPor tu infinita misericordia, perdona mis pecados y ayúdame a ser mejor mañana.\n\nProtege durante la noche a mi familia y a todos mis seres queridos. Concede el descanso eterno a los fieles difuntos y fortalece a los que sufren.\n\nEn tus manos encomiendo mi alma. Que María Santísima me cubra con su manto maternal.\n\nAmén.",
-                "final_prayers": {
-                    "act_of_contrition": "Señor mío Jesucristo, Dios y hombre verdadero, me pesa de todo corazón haberte ofendido, porque eres infinitamente bueno y amable y el pecado te desagrada. Propongo firmemente, con el auxilio de tu gracia, enmendarme y alejarme de las ocasiones de pecar, confesarme y cumplir la penitencia. Confío en que me perdonarás por tu infinita misericordia. Amén.",
-                    "consecration_to_mary": "Oh Señora mía, oh Madre mía, yo me ofrezco todo a Ti, y en prueba de mi filial afecto, te consagro en este día mis ojos, mis oídos, mi lengua, mi corazón; en una palabra, todo mi ser. Ya que soy todo tuyo, oh Madre de bondad, guárdame y defiéndeme como cosa y posesión tuya. Amén."
-                }
-            }
-        ),
-        SpiritualContentCreate(
-            category="pilgrim_prayer",
-            title="Oración del Peregrino",
-            description="Oraciones especiales para el tiempo de peregrinación",
-            content={
-                "introduction": "Oraciones especiales para acompañar al peregrino en su caminar hacia los lugares santos.",
-                "main_prayer": "Señor Jesús, como los discípulos de Emaús, camino contigo buscando tu rostro en los lugares santos donde pisaste esta tierra.\n\nHaz que en esta peregrinación mi corazón se abra a tu palabra, mis ojos te reconozcan en el hermano que camina a mi lado, y mis pies sigan fielmente tus huellas.\n\nQue cada paso sea una oración, cada lugar visitado sea un encuentro contigo, y cada momento compartido sea una oportunidad de crecer en santidad.\n\nMadre María, Reina de los Peregrinos, acompáñanos en este camino santo. Protégenos de todo peligro y ayúdanos a llevar tu hijo Jesús en nuestros corazones.\n\nSan José, protector de la Sagrada Familia, cuida de nosotros como cuidaste de Jesús y María en sus viajes.\n\nQue esta peregrinación transforme nuestras vidas y nos haga mejores cristianos.\n\nAmén.",
-                "travel_prayer": "Señor, bendice nuestro viaje. Que los ángeles nos acompañen por el camino, que María Santísima nos proteja, y que lleguemos con bien a nuestro destino. Amén.",
-                "unity_prayer": "Señor Jesús, bendice a nuestro grupo de peregrinos. Que seamos uno en Ti como Tú eres uno con el Padre. Ayúdanos a ser pacientes unos con otros, a compartir nuestras alegrías y a apoyarnos en las dificultades. Que el amor fraterno sea el signo de que somos tus discípulos. Amén.",
-                "holy_places_prayer": "Jesús, al visitar estos lugares santos donde viviste, sufriste y resucitaste, aumenta mi fe, fortalece mi esperanza y enciende mi caridad. Que cada piedra me hable de tu amor, cada rincón me recuerde tu sacrificio, y cada momento me acerque más a Ti. Amén.",
-                "thanksgiving_prayer": "Gracias, Señor, por este día santo. Que las experiencias vividas fructifiquen en mi alma y me ayuden a ser mejor cristiano al regresar a casa. Que este viaje no termine aquí, sino que sea el comienzo de una vida más santa y comprometida contigo. Amén."
-            }
-        )
+    _after_write(collection.name)
+    return result.upserted_count
+
+async def initialize_database():
+    """Seed the fixture data; run once the id_unique indexes exist"""
+    with open(SEED_FIXTURE, encoding='utf-8') as f:
+        seed = json.load(f)
+
+    # Only hash passwords for seed users that are not in the database yet
+    seed_emails = [user["email"] for user in seed["users"]]
+    existing_emails = await get_existing_emails(seed_emails)
+    new_users = [user for user in seed["users"] if user["email"] not in existing_emails]
+
+    from .auth import get_password_hash_async
+    password_hashes = await asyncio.gather(*(get_password_hash_async(user["password"]) for user in new_users))
+    users = [
+        _to_document(User(password_hash=password_hash, **{k: v for k, v in user.items() if k != "password"}))
+        for user, password_hash in zip(new_users, password_hashes)
     ]
-    
-    for content_data in spiritual_contents:
-        await create_spiritual_content(content_data)
-    
-    print("Database initialized successfully!")
\ No newline at end of file
+
+    # Re-running the seed fills in whatever is missing and never duplicates what is already there
+    inserted = await asyncio.gather(
+        _seed_collection(users_collection, users),
+        _seed_collection(groups_collection, [_to_document(PilgrimageGroup(**group)) for group in seed["pilgrimage_groups"]]),
+        _seed_collection(destinations_collection, [_to_document(Destination(**destination)) for destination in seed["destinations"]], "name"),
+        _seed_collection(spiritual_content_collection, [_to_document(SpiritualContent(**content)) for content in seed["spiritual_content"]], "title"),
+    )
+    invalidate_public_content("destinations")
+    invalidate_public_content("spiritual_content")
+    for group in seed["pilgrimage_groups"]:
+        invalidate_group_responses(group["id"])
+    if any(inserted):
+        logger.info("Seeded sample data", extra={"inserted": sum(inserted)})
@@ -0,0 +1,149 @@
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from typing import Dict, List, Optional
+import logging
+import os
+import time
+
+from .database import db
+from .pagination import SORT_KEYS
+
+logger = logging.getLogger(__name__)
+
+# How long /api/metrics reuses a drift report before asking MongoDB again
+INDEX_DRIFT_TTL = float(os.environ.get("INDEX_DRIFT_TTL", "300"))
+
+# Indexes every collection needs, keyed by collection name.
+# Each entry backs a lookup in database.py; keep them in sync when adding queries.
+# A compound index also serves queries on its leading fields, so no single-field
+# index is declared where a compound one (below or in the pagination indexes)
+# starts with the same field.
+REQUIRED_INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Kept beside the email_id pagination index: this one enforces uniqueness
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("group_id", ASCENDING)], name="group_id"),
+    ],
+    "pilgrimage_groups": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Covers version stamp lookups for conditional GETs
+        IndexModel([("id", ASCENDING), ("updated_at", ASCENDING)], name="id_updated_at"),
+    ],
+    "itineraries": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Also serves lookups by group_id alone
+        IndexModel([("group_id", ASCENDING), ("updated_at", ASCENDING), ("id", ASCENDING)],
+                   name="group_id_updated_at"),
+    ],
+    "destinations": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("id", ASCENDING), ("updated_at", ASCENDING)], name="id_updated_at"),
+    ],
+    "spiritual_content": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Lookups by category use the category_id pagination index
+    ],
+    "refresh_tokens": [
+        IndexModel([("token_hash", ASCENDING)], name="token_hash_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # MongoDB removes tokens once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "revoked_tokens": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Compound (sort key, id) indexes backing keyset pagination
+for _collection_name, _sort_keys in SORT_KEYS.items():
+    REQUIRED_INDEXES[_collection_name].extend(
+        IndexModel([(key, ASCENDING), ("id", ASCENDING)], name=f"{key}_id") for key in _sort_keys
+    )
+
+def _key_of(spec: dict) -> tuple:
+    # IndexModel documents hold a SON, index_information() a list of pairs
+    key = spec["key"].items() if hasattr(spec["key"], "items") else spec["key"]
+    return tuple(
+        (field, direction if isinstance(direction, str) else int(direction))
+        for field, direction in key
+    )
+
+def _declared(collection_name: str) -> Dict[tuple, dict]:
+    return {_key_of(index.document): index.document for index in REQUIRED_INDEXES[collection_name]}
+
+def _options(spec: dict) -> tuple:
+    # Options that change what an index does; a TTL index is only one with expireAfterSeconds
+    ttl = spec.get("expireAfterSeconds")
+    return bool(spec.get("unique")), None if ttl is None else int(ttl)
+
+async def _existing(collection_name: str) -> Dict[tuple, dict]:
+    info = await db[collection_name].index_information()
+    return {_key_of(spec): spec for spec in info.values()}
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Create every declared index that is missing; returns created index names per collection"""
+    created = {}
+    for collection_name in REQUIRED_INDEXES:
+        try:
+            existing = await _existing(collection_name)
+            missing = [
+                index for index in REQUIRED_INDEXES[collection_name]
+                if _key_of(index.document) not in existing
+            ]
+            if missing:
+                created[collection_name] = await db[collection_name].create_indexes(missing)
+                logger.info(f"Created indexes on {collection_name}: {created[collection_name]}")
+        except PyMongoError as e:
+            logger.error(f"Could not create indexes on {collection_name}: {str(e)}")
+    try:
+        await refresh_index_drift()
+    except PyMongoError as e:
+        logger.error(f"Could not check index drift: {str(e)}")
+    return created
+
+async def get_index_drift() -> Dict[str, dict]:
+    """Compare declared indexes with the ones present in MongoDB"""
+    drift = {}
+    for collection_name in REQUIRED_INDEXES:
+        declared = _declared(collection_name)
+        existing = await _existing(collection_name)
+        report = {
+            "missing": [spec["name"] for key, spec in declared.items() if key not in existing],
+            "mismatched": [
+                spec["name"] for key, spec in declared.items()
+                if key in existing and _options(existing[key]) != _options(spec)
+            ],
+            # Left over from earlier declarations, e.g. single-field indexes now
+            # covered by a compound one; safe to drop once confirmed unused
+            "unexpected": [
+                spec["name"] for key, spec in existing.items()
+                if key not in declared and key != (("_id", 1),)
+            ],
+        }
+        report = {kind: names for kind, names in report.items() if names}
+        if report:
+            drift[collection_name] = report
+    return drift
+
+# Last drift report and when it was taken; /api/health only ever reads these
+_last_drift: Optional[Dict[str, dict]] = None
+_last_drift_at = float("-inf")
+
+async def refresh_index_drift() -> Dict[str, dict]:
+    global _last_drift, _last_drift_at
+    _last_drift = await get_index_drift()
+    _last_drift_at = time.monotonic()
+    return _last_drift
+
+async def cached_index_drift() -> Dict[str, dict]:
+    """Drift report, taken again once the last one is older than INDEX_DRIFT_TTL"""
+    if _last_drift is None or time.monotonic() - _last_drift_at > INDEX_DRIFT_TTL:
+        return await refresh_index_drift()
+    return _last_drift
+
+def index_status() -> str:
+    """Outcome of the last drift report, "ok", "drift" or "unknown", without a database call"""
+    if _last_drift is None:
+        return "unknown"
+    return "drift" if _last_drift else "ok"
@@ -0,0 +1,119 @@
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Any, Optional
+import json
+import logging
+import os
+import queue
+import random
+import re
+import uuid
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "json" for one JSON object per line, "text" for a human readable line
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+# Fraction of requests whose debug payloads (whole documents) get logged
+DEBUG_SAMPLE_RATE = float(os.environ.get("DEBUG_SAMPLE_RATE", "0.01"))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Client supplied ids end up in every log line, so only accept plain tokens
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+debug_sampled_var: ContextVar[bool] = ContextVar("debug_sampled", default=False)
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the correlation id of the request being handled"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+_listener: Optional[QueueListener] = None
+
+def setup_logging() -> None:
+    """Route all logging through a queue; a listener thread does the actual writes"""
+    global _listener
+    if _listener is not None:
+        return
+    stream_handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+        ))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # The request id lives in a context variable, so read it before the record changes threads
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def debug_payload(logger: logging.Logger, message: str, **fields: Any) -> None:
+    """Debug-log a large payload, only for the sampled fraction of requests"""
+    if debug_sampled_var.get() and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, extra=fields)
+
+class CorrelationIdMiddleware:
+    """Give every request a correlation id, taken from X-Request-ID or generated, and echo it back"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER, "")
+        if not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request_token = request_id_var.set(request_id)
+        sampled_token = debug_sampled_var.set(random.random() < DEBUG_SAMPLE_RATE)
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(request_token)
+            debug_sampled_var.reset(sampled_token)
@@ -1,9 +1,13 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, EmailStr
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 import uuid
 
+# Stamped on every document the service writes. Bump it whenever a model
+# changes so that documents written earlier no longer match it.
+SCHEMA_VERSION = 1
+
 class UserRole(str, Enum):
     ADMIN = "admin"
     PILGRIM = "pilgrim"
@@ -22,6 +26,8 @@ class User(BaseModel):
     name: str
     role: UserRole
     group_id: Optional[str] = None
+    # Bumped whenever claims embedded in issued tokens go stale
+    token_version: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -50,6 +56,20 @@ class UserUpdate(BaseModel):
     password: Optional[str] = None
     group_id: Optional[str] = None
 
+# Bulk Import Models
+class BulkImportRowResult(BaseModel):
+    row: int
+    email: Optional[str] = None
+    status: str  # created, duplicate, invalid, failed
+    user_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkImportReport(BaseModel):
+    total: int
+    created: int
+    failed: int
+    rows: List[BulkImportRowResult]
+
 # Pilgrimage Group Models
 class PilgrimInfo(BaseModel):
     id: str
@@ -83,6 +103,9 @@ class PilgrimageGroupUpdate(BaseModel):
 
 # Flight Models
 class FlightInfo(BaseModel):
+    # Accept `from_location` as well as the stored/wire name `from`
+    model_config = ConfigDict(populate_by_name=True)
+
     from_location: str = Field(..., alias="from")
     to: str
     date: str
@@ -91,6 +114,8 @@ class FlightInfo(BaseModel):
     flight_number: str
 
 class FlightDetails(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
     departure: FlightInfo
     return_flight: FlightInfo = Field(..., alias="return")
 
@@ -198,6 +223,33 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+class TokenRefresh(BaseModel):
+    access_token: str
+    token_type: str
+    refresh_token: str
 
 class TokenData(BaseModel):
-    email: Optional[str] = None
\ No newline at end of file
+    email: Optional[str] = None
+    user_id: Optional[str] = None
+    role: Optional[UserRole] = None
+    group_id: Optional[str] = None
+    token_version: Optional[int] = None
+    token_id: Optional[str] = None
+    issued_at: Optional[int] = None
+    expires_at: Optional[int] = None
+
+class Principal(BaseModel):
+    """Identity and authorization claims carried by an access token"""
+    id: str
+    email: str
+    role: UserRole
+    group_id: Optional[str] = None
+    token_version: int = 0
\ No newline at end of file
@@ -0,0 +1,107 @@
+from fastapi import HTTPException, Query, Response, status
+from pymongo import ASCENDING, DESCENDING
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import base64
+import binascii
+import json
+
+MAX_PAGE_SIZE = 500
+DEFAULT_SORT = "created_at"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Sort keys each list endpoint accepts, keyed by collection name.
+# indexes.py declares a compound (key, id) index for every entry, so a page
+# is an index range scan whatever its depth.
+SORT_KEYS: Dict[str, Tuple[str, ...]] = {
+    "users": ("created_at", "name", "email"),
+    "pilgrimage_groups": ("created_at", "start_date", "name"),
+    "itineraries": ("created_at", "group_id"),
+    "destinations": ("created_at", "name", "country"),
+    "spiritual_content": ("created_at", "category", "title"),
+}
+
+class PageParams(NamedTuple):
+    sort_field: str = DEFAULT_SORT
+    direction: int = ASCENDING
+    limit: Optional[int] = None
+    # (sort value, id) of the last item of the previous page
+    after: Optional[Tuple[Any, str]] = None
+
+    @property
+    def sort_token(self) -> str:
+        return self.sort_field if self.direction == ASCENDING else f"-{self.sort_field}"
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str] = None
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+def encode_cursor(params: PageParams, value: Any, item_id: str) -> str:
+    if isinstance(value, datetime):
+        value = {"$dt": value.isoformat()}
+    raw = json.dumps({"s": params.sort_token, "v": value, "id": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, sort_token: str) -> Tuple[Any, str]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        value, item_id = data["v"], data["id"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$dt"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise _bad_request("Invalid cursor")
+    if data.get("s") != sort_token:
+        raise _bad_request("Cursor does not match the requested sort")
+    return value, item_id
+
+def page_params(collection_name: str) -> Callable[..., PageParams]:
+    """FastAPI dependency parsing ?limit=&after=&sort= for a collection"""
+    allowed = SORT_KEYS[collection_name]
+
+    def dependency(
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = None,
+        sort: str = DEFAULT_SORT,
+    ) -> PageParams:
+        field = sort.lstrip("-")
+        if field not in allowed:
+            raise _bad_request(f"Unsupported sort key '{field}', expected one of: {', '.join(allowed)}")
+        direction = DESCENDING if sort.startswith("-") else ASCENDING
+        params = PageParams(sort_field=field, direction=direction, limit=limit)
+        if after:
+            params = params._replace(after=decode_cursor(after, params.sort_token))
+        return params
+
+    return dependency
+
+def keyset_query(query: dict, params: PageParams) -> dict:
+    """Restrict `query` to documents that sort after the cursor"""
+    if params.after is None:
+        return query
+    value, item_id = params.after
+    op = "$gt" if params.direction == ASCENDING else "$lt"
+    after = {"$or": [
+        {params.sort_field: {op: value}},
+        {params.sort_field: value, "id": {op: item_id}},
+    ]}
+    return {"$and": [query, after]} if query else after
+
+def sort_spec(params: PageParams) -> List[Tuple[str, int]]:
+    # `id` breaks ties so the order is total and cursors are stable
+    return [(params.sort_field, params.direction), ("id", params.direction)]
+
+def next_page(items: list, params: PageParams) -> Page:
+    """Build a Page from up to limit + 1 fetched items"""
+    if params.limit is None or len(items) <= params.limit:
+        return Page(items=items)
+    items = items[:params.limit]
+    last = items[-1]
+    return Page(items=items, next_cursor=encode_cursor(params, getattr(last, params.sort_field), last.id))
+
+def set_next_cursor(response: Response, page: Page) -> None:
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
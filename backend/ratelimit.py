@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from fastapi import HTTPException, Request, status
+from typing import Hashable
+import math
+import os
+import time
+
+class TokenBucketLimiter:
+    """Per-key token buckets holding `capacity` attempts that refill over `window` seconds"""
+
+    def __init__(self, capacity: int, window: float, max_keys: int = 100000):
+        self.capacity = capacity
+        self.refill_rate = capacity / window
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def _tokens(self, key: Hashable, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+    def retry_after(self, key: Hashable) -> float:
+        """Seconds until `key` has a token again, without taking one; 0 when it has one now"""
+        tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.refill_rate
+
+    def acquire(self, key: Hashable) -> float:
+        """Take one token; returns 0 when allowed, otherwise seconds until the next token"""
+        now = time.monotonic()
+        tokens = self._tokens(key, now)
+        self._buckets.pop(key, None)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.refill_rate
+            self.rejected += 1
+        self._buckets[key] = (tokens, now)
+        # Forget the least recently seen keys; they come back with a full bucket
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def check(self, key: Hashable) -> None:
+        """Take a token for this attempt, or reject it with 429"""
+        self._reject_if_waiting(self.acquire(key))
+
+    def refund(self, key: Hashable) -> None:
+        """Give back a token taken by check() or acquire(), e.g. for an attempt that succeeded.
+        Taking first and refunding later keeps concurrent attempts from all getting past an empty bucket."""
+        if key in self._buckets:
+            now = time.monotonic()
+            self._buckets[key] = (min(self.capacity, self._tokens(key, now) + 1), now)
+
+    def _reject_if_waiting(self, retry_after: float) -> None:
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers and --forwarded-allow-ips
+    # set to the proxy's address: it then puts the real client address from
+    # X-Forwarded-For here, and ignores the header from anyone else
+    return request.client.host if request.client else "unknown"
+
+# Failed logins per client address. Every attempt takes a token before any
+# hashing and successful ones give it back, so only failures count and a whole
+# pilgrim group logging in from behind one hotel NAT is never throttled.
+login_ip_limiter = TokenBucketLimiter(
+    capacity=int(os.environ.get("LOGIN_IP_FAILURES", "50")),
+    window=float(os.environ.get("LOGIN_IP_WINDOW_SECONDS", "60")),
+)
+login_account_limiter = TokenBucketLimiter(
+    capacity=int(os.environ.get("LOGIN_ACCOUNT_ATTEMPTS", "5")),
+    window=float(os.environ.get("LOGIN_ACCOUNT_WINDOW_SECONDS", "60")),
+)
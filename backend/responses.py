@@ -0,0 +1,39 @@
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Any, List, Type, Union
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+def _encode_model(obj: Any) -> Any:
+    # orjson handles datetimes, enums and UUIDs itself; models only need dumping
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(by_alias=True)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+class ModelJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, accepting Pydantic models as content"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_encode_model)
+
+# Application-wide response class; plain JSONResponse when orjson is missing
+DefaultJSONResponse = ModelJSONResponse if orjson else JSONResponse
+
+def model_response(content: Union[BaseModel, List[BaseModel]], model: Type[BaseModel], response: Response) -> Any:
+    """Serialise models the handler already built as `model` directly, skipping
+    FastAPI's response_model validation and jsonable_encoder pass.
+
+    Headers set on the injected `response` are carried over. Anything else
+    (including subclasses, whose extra fields response_model would filter out)
+    is returned unchanged for FastAPI to handle as usual.
+    """
+    items = content if isinstance(content, list) else [content]
+    if orjson is None or any(type(item) is not model for item in items):
+        return content
+    fast = ModelJSONResponse(content)
+    fast.raw_headers.extend(response.raw_headers)
+    return fast
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set
+import asyncio
+import logging
+import os
+
+from .models import TokenData
+
+logger = logging.getLogger(__name__)
+
+# How often every process reloads revocations written by the others
+REVOCATION_REFRESH_SECONDS = float(os.environ.get("REVOCATION_REFRESH_SECONDS", "30"))
+
+class RevocationList:
+    """In-process mirror of the revoked_tokens collection"""
+
+    def __init__(self):
+        # Individually revoked tokens (logout)
+        self._token_ids: Set[str] = set()
+        # Lowest token version ("ver" claim) still accepted per user. A counter
+        # rather than a cutoff time, whose one-second `iat` precision would also
+        # catch tokens issued just after the revocation.
+        self._users: Dict[str, int] = {}
+        # Local additions since the last reload, which may have missed them
+        self._pending_token_ids: Set[str] = set()
+        self._pending_users: Dict[str, int] = {}
+
+    def is_revoked(self, token_data: TokenData) -> bool:
+        if token_data.token_id and token_data.token_id in self._token_ids:
+            return True
+        min_version = self._users.get(token_data.user_id) if token_data.user_id else None
+        return min_version is not None and (token_data.token_version or 0) < min_version
+
+    def add_token(self, token_id: str) -> None:
+        self._token_ids.add(token_id)
+        self._pending_token_ids.add(token_id)
+
+    def add_user(self, user_id: str, min_version: int) -> None:
+        for users in (self._users, self._pending_users):
+            users[user_id] = max(min_version, users.get(user_id, 0))
+
+    def replace(self, token_ids: Set[str], users: Dict[str, int]) -> None:
+        """Swap in a fresh snapshot, keeping additions made while it was loading"""
+        token_ids |= self._pending_token_ids
+        for user_id, min_version in self._pending_users.items():
+            users[user_id] = max(min_version, users.get(user_id, 0))
+        self._token_ids, self._users = token_ids, users
+        self._pending_token_ids, self._pending_users = set(), {}
+
+    def stats(self) -> Dict[str, int]:
+        return {"tokens": len(self._token_ids), "users": len(self._users)}
+
+revocation_list = RevocationList()
+
+async def revoke_token(token_id: str, expires_at: Optional[int]) -> None:
+    """Revoke a single access token until it would have expired anyway"""
+    from .database import add_revocation
+    revocation_list.add_token(token_id)
+    expires = datetime.utcfromtimestamp(expires_at) if expires_at else datetime.utcnow() + timedelta(days=1)
+    await add_revocation({"jti": token_id, "expires_at": expires})
+
+async def revoke_user_tokens(user_id: str, min_version: int) -> None:
+    """Revoke every access token of a user whose version is below `min_version`.
+
+    Call this after the user's token_version has been raised to `min_version`
+    in the database, so that no token can be issued with an old version once
+    the revocation is in place.
+    """
+    from .database import add_revocation
+    from .auth import ACCESS_TOKEN_EXPIRE_MINUTES
+    revocation_list.add_user(user_id, min_version)
+    # Older tokens have all expired by then, so the entry can go too
+    await add_revocation({
+        "user_id": user_id,
+        "min_version": min_version,
+        "expires_at": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    })
+
+async def refresh_revocations() -> None:
+    from .database import get_active_revocations
+    token_ids, users = set(), {}
+    for doc in await get_active_revocations():
+        if doc.get("jti"):
+            token_ids.add(doc["jti"])
+        elif doc.get("user_id") and "min_version" in doc:
+            users[doc["user_id"]] = max(doc["min_version"], users.get(doc["user_id"], 0))
+    revocation_list.replace(token_ids, users)
+
+async def refresh_revocations_forever() -> None:
+    """Reload revocations periodically; the first load happens at startup"""
+    while True:
+        await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+        try:
+            await refresh_revocations()
+        except Exception as e:
+            logger.error(f"Could not refresh token revocations: {str(e)}")
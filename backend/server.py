@@ -1,21 +1,39 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
-from fastapi.security import HTTPBearer
+from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException, Depends, Request, Response, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from starlette.middleware.cors import CORSMiddleware
 from datetime import timedelta
+import asyncio
 import os
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 # Import our models and database functions
 from .models import *
 from .database import *
 from .auth import *
+from .indexes import cached_index_drift, ensure_indexes, index_status
+from .pagination import NEXT_CURSOR_HEADER, PageParams, page_params, set_next_cursor
+from .streaming import ndjson_response, wants_ndjson
+from .bulk_import import import_users, parse_rows
+from .cache import cache_stats, cached_group_response, group_response_etag, invalidate_principal
+from .compression import CompressionMiddleware
+from .log import REQUEST_ID_HEADER, CorrelationIdMiddleware, setup_logging, stop_logging
+from .responses import DefaultJSONResponse, model_response
+from .conditional import check_collection_not_modified, check_not_modified, resource_etag, stamp_etag
+from .ratelimit import client_ip, login_account_limiter, login_ip_limiter
+from .revocation import refresh_revocations, refresh_revocations_forever, revocation_list, revoke_token, revoke_user_tokens
+from .singleflight import flight_stats
+from .versions import version_stats
 
 ROOT_DIR = Path(__file__).parent
 
+# Configure logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Create the main app without a prefix
-app = FastAPI(title="Sacred Journey API", version="1.0.0")
+app = FastAPI(title="Sacred Journey API", version="1.0.0", default_response_class=DefaultJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -27,7 +45,10 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(CorrelationIdMiddleware)
 
 # Authentication endpoints
 @api_router.post("/auth/register", response_model=UserResponse)
@@ -42,7 +63,7 @@ async def register(user_data: UserCreate):
         )
     
     # Hash password and create user
-    password_hash = get_password_hash(user_data.password)
+    password_hash = await get_password_hash_async(user_data.password)
     user = await create_user(user_data, password_hash)
     
     # If user is a pilgrim and has group_id, add them to the group
@@ -64,24 +85,42 @@ async def register(user_data: UserCreate):
     )
 
 @api_router.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin):
+async def login(user_credentials: UserLogin, request: Request, background_tasks: BackgroundTasks):
     """Login user and return access token"""
+    # Throttle before any database or bcrypt work
+    ip = client_ip(request)
+    login_ip_limiter.check(ip)
+    login_account_limiter.check(user_credentials.email.lower())
+    
     user = await get_user_by_email(user_credentials.email)
-    if not user or not verify_password(user_credentials.password, user.password_hash):
+    if not user:
+        await verify_dummy_password(user_credentials.password)
+    if not user or not await verify_password_async(user_credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Only failed attempts count against the client address
+    login_ip_limiter.refund(ip)
+    
+    # Move hashes made with an outdated work factor to the current one after responding
+    if pwd_context.needs_update(user.password_hash):
+        background_tasks.add_task(rehash_password, user.id, user_credentials.password, user.password_hash)
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = access_token_claims(user)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=claims, expires_delta=access_token_expires
     )
+    refresh_token, refresh_token_hash, refresh_expires_at = new_refresh_token()
+    await create_refresh_token(refresh_token_hash, user.id, claims, refresh_expires_at)
     
     return Token(
         access_token=access_token,
         token_type="bearer",
+        refresh_token=refresh_token,
         user=UserResponse(
             id=user.id,
             email=user.email,
@@ -92,6 +131,38 @@ async def login(user_credentials: UserLogin):
         )
     )
 
+@api_router.post("/auth/refresh", response_model=TokenRefresh)
+async def refresh_access_token(refresh_request: RefreshRequest):
+    """Exchange a refresh token for a new access token and a new refresh token"""
+    stored = await consume_refresh_token(hash_refresh_token(refresh_request.refresh_token))
+    if not stored:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    claims = stored["claims"]
+    check_token_active(TokenData(user_id=claims["uid"], token_version=claims["ver"]))
+    
+    access_token = create_access_token(
+        data=claims, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token, refresh_token_hash, refresh_expires_at = new_refresh_token()
+    await create_refresh_token(refresh_token_hash, stored["user_id"], claims, refresh_expires_at)
+    return TokenRefresh(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+@api_router.post("/auth/logout")
+async def logout(logout_request: Optional[LogoutRequest] = None, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the presented access token and, if given, the refresh token"""
+    if not credentials.credentials.startswith('admin-bypass-token-'):
+        token_data = verify_token(credentials.credentials)
+        check_token_active(token_data)
+        if token_data.token_id:
+            await revoke_token(token_data.token_id, token_data.expires_at)
+    if logout_request and logout_request.refresh_token:
+        await consume_refresh_token(hash_refresh_token(logout_request.refresh_token))
+    return {"message": "Logged out successfully"}
+
 @api_router.get("/auth/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
@@ -106,16 +177,23 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 # Pilgrimage Groups endpoints
 @api_router.get("/groups", response_model=List[PilgrimageGroup])
-async def get_all_groups(current_user: User = Depends(get_current_admin)):
+async def get_all_groups(request: Request, response: Response, page: PageParams = Depends(page_params("pilgrimage_groups")),
+                         current_user: Principal = Depends(get_current_admin)):
     """Get all pilgrimage groups (admin only)"""
-    return await get_all_pilgrimage_groups()
+    if wants_ndjson(request):
+        return ndjson_response(iter_all_pilgrimage_groups(page))
+    unchanged = check_collection_not_modified(request, response, "pilgrimage_groups")
+    if unchanged:
+        return unchanged
+    groups = await get_all_pilgrimage_groups(page)
+    set_next_cursor(response, groups)
+    return model_response(groups.items, PilgrimageGroup, response)
 
 @api_router.get("/groups/{group_id}", response_model=PilgrimageGroup)
-async def get_group(group_id: str, current_user: User = Depends(get_current_user)):
+async def get_group(group_id: str, request: Request, current_user: Principal = Depends(get_current_principal)):
     """Get specific pilgrimage group"""
-    # Debug: print the group_id and user info
-    print(f"DEBUG: Looking for group_id: {group_id}")
-    print(f"DEBUG: Current user: {current_user.email}, group_id: {current_user.group_id}")
+    logger.debug("Group requested", extra={"group_id": group_id, "user_id": current_user.id,
+                                           "user_group_id": current_user.group_id})
     
     # Pilgrims can only access their own group
     if current_user.role == UserRole.PILGRIM and current_user.group_id != group_id:
@@ -124,22 +202,28 @@ async def get_group(group_id: str, current_user: User = Depends(get_current_user
             detail="Not authorized to access this group"
         )
     
-    group = await get_pilgrimage_group_by_id(group_id)
-    print(f"DEBUG: Retrieved group: {group}")
-    if not group:
+    unchanged = await check_not_modified(
+        request, lambda: group_response_etag(group_id, "group", lambda: get_pilgrimage_group_stamp(group_id))
+    )
+    if unchanged:
+        return unchanged
+    
+    cached = await cached_group_response(group_id, "group", lambda: get_pilgrimage_group_by_id(group_id))
+    if cached is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Group not found"
         )
-    return group
+    etag, body = cached
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @api_router.post("/groups", response_model=PilgrimageGroup)
-async def create_group(group_data: PilgrimageGroupCreate, current_user: User = Depends(get_current_admin)):
+async def create_group(group_data: PilgrimageGroupCreate, current_user: Principal = Depends(get_current_admin)):
     """Create new pilgrimage group (admin only)"""
     return await create_pilgrimage_group(group_data)
 
 @api_router.put("/groups/{group_id}", response_model=PilgrimageGroup)
-async def update_group(group_id: str, group_data: PilgrimageGroupUpdate, current_user: User = Depends(get_current_admin)):
+async def update_group(group_id: str, group_data: PilgrimageGroupUpdate, current_user: Principal = Depends(get_current_admin)):
     """Update pilgrimage group (admin only)"""
     group = await update_pilgrimage_group(group_id, group_data)
     if not group:
@@ -150,7 +234,7 @@ async def update_group(group_id: str, group_data: PilgrimageGroupUpdate, current
     return group
 
 @api_router.delete("/groups/{group_id}")
-async def delete_group(group_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_group(group_id: str, current_user: Principal = Depends(get_current_admin)):
     """Delete pilgrimage group (admin only)"""
     success = await delete_pilgrimage_group(group_id)
     if not success:
@@ -162,12 +246,20 @@ async def delete_group(group_id: str, current_user: User = Depends(get_current_a
 
 # Itinerary endpoints
 @api_router.get("/itineraries", response_model=List[Itinerary])
-async def get_all_itineraries_endpoint(current_user: User = Depends(get_current_admin)):
+async def get_all_itineraries_endpoint(request: Request, response: Response, page: PageParams = Depends(page_params("itineraries")),
+                                       current_user: Principal = Depends(get_current_admin)):
     """Get all itineraries (admin only)"""
-    return await get_all_itineraries()
+    if wants_ndjson(request):
+        return ndjson_response(iter_all_itineraries(page))
+    unchanged = check_collection_not_modified(request, response, "itineraries")
+    if unchanged:
+        return unchanged
+    itineraries = await get_all_itineraries(page)
+    set_next_cursor(response, itineraries)
+    return model_response(itineraries.items, Itinerary, response)
 
 @api_router.get("/itineraries/group/{group_id}", response_model=Itinerary)
-async def get_itinerary_by_group(group_id: str, current_user: User = Depends(get_current_user)):
+async def get_itinerary_by_group(group_id: str, request: Request, current_user: Principal = Depends(get_current_principal)):
     """Get itinerary for specific group"""
     # Pilgrims can only access their own group's itinerary
     if current_user.role == UserRole.PILGRIM and current_user.group_id != group_id:
@@ -176,21 +268,28 @@ async def get_itinerary_by_group(group_id: str, current_user: User = Depends(get
             detail="Not authorized to access this itinerary"
         )
     
-    itinerary = await get_itinerary_by_group_id(group_id)
-    if not itinerary:
+    unchanged = await check_not_modified(
+        request, lambda: group_response_etag(group_id, "itinerary", lambda: get_itinerary_stamp_by_group_id(group_id))
+    )
+    if unchanged:
+        return unchanged
+    
+    cached = await cached_group_response(group_id, "itinerary", lambda: get_itinerary_by_group_id(group_id))
+    if cached is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Itinerary not found"
         )
-    return itinerary
+    etag, body = cached
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @api_router.post("/itineraries", response_model=Itinerary)
-async def create_itinerary_endpoint(itinerary_data: ItineraryCreate, current_user: User = Depends(get_current_admin)):
+async def create_itinerary_endpoint(itinerary_data: ItineraryCreate, current_user: Principal = Depends(get_current_admin)):
     """Create new itinerary (admin only)"""
     return await create_itinerary(itinerary_data)
 
 @api_router.put("/itineraries/{itinerary_id}", response_model=Itinerary)
-async def update_itinerary_endpoint(itinerary_id: str, itinerary_data: ItineraryUpdate, current_user: User = Depends(get_current_admin)):
+async def update_itinerary_endpoint(itinerary_id: str, itinerary_data: ItineraryUpdate, current_user: Principal = Depends(get_current_admin)):
     """Update itinerary (admin only)"""
     itinerary = await update_itinerary(itinerary_id, itinerary_data)
     if not itinerary:
@@ -201,7 +300,7 @@ async def update_itinerary_endpoint(itinerary_id: str, itinerary_data: Itinerary
     return itinerary
 
 @api_router.delete("/itineraries/{itinerary_id}")
-async def delete_itinerary_endpoint(itinerary_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_itinerary_endpoint(itinerary_id: str, current_user: Principal = Depends(get_current_admin)):
     """Delete itinerary (admin only)"""
     success = await delete_itinerary(itinerary_id)
     if not success:
@@ -213,28 +312,43 @@ async def delete_itinerary_endpoint(itinerary_id: str, current_user: User = Depe
 
 # Destinations endpoints
 @api_router.get("/destinations", response_model=List[Destination])
-async def get_all_destinations_endpoint():
+async def get_all_destinations_endpoint(request: Request, response: Response, page: PageParams = Depends(page_params("destinations"))):
     """Get all destinations (public)"""
-    return await get_all_destinations()
+    if wants_ndjson(request):
+        return ndjson_response(iter_all_destinations(page))
+    unchanged = check_collection_not_modified(request, response, "destinations")
+    if unchanged:
+        return unchanged
+    destinations = await get_all_destinations(page)
+    set_next_cursor(response, destinations)
+    return model_response(destinations.items, Destination, response)
+
+async def get_destination_etag(destination_id: str) -> Optional[str]:
+    return stamp_etag(await get_destination_stamp(destination_id))
 
 @api_router.get("/destinations/{destination_id}", response_model=Destination)
-async def get_destination(destination_id: str):
+async def get_destination(destination_id: str, request: Request, response: Response):
     """Get specific destination (public)"""
+    unchanged = await check_not_modified(request, lambda: get_destination_etag(destination_id))
+    if unchanged:
+        return unchanged
+    
     destination = await get_destination_by_id(destination_id)
     if not destination:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Destination not found"
         )
-    return destination
+    response.headers["ETag"] = resource_etag(destination.id, destination.updated_at)
+    return model_response(destination, Destination, response)
 
 @api_router.post("/destinations", response_model=Destination)
-async def create_destination_endpoint(destination_data: DestinationCreate, current_user: User = Depends(get_current_admin)):
+async def create_destination_endpoint(destination_data: DestinationCreate, current_user: Principal = Depends(get_current_admin)):
     """Create new destination (admin only)"""
     return await create_destination(destination_data)
 
 @api_router.put("/destinations/{destination_id}", response_model=Destination)
-async def update_destination_endpoint(destination_id: str, destination_data: DestinationUpdate, current_user: User = Depends(get_current_admin)):
+async def update_destination_endpoint(destination_id: str, destination_data: DestinationUpdate, current_user: Principal = Depends(get_current_admin)):
     """Update destination (admin only)"""
     destination = await update_destination(destination_id, destination_data)
     if not destination:
@@ -245,7 +359,7 @@ async def update_destination_endpoint(destination_id: str, destination_data: Des
     return destination
 
 @api_router.delete("/destinations/{destination_id}")
-async def delete_destination_endpoint(destination_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_destination_endpoint(destination_id: str, current_user: Principal = Depends(get_current_admin)):
     """Delete destination (admin only)"""
     success = await delete_destination(destination_id)
     if not success:
@@ -257,22 +371,32 @@ async def delete_destination_endpoint(destination_id: str, current_user: User =
 
 # Spiritual Content endpoints
 @api_router.get("/spiritual-content", response_model=List[SpiritualContent])
-async def get_all_spiritual_content_endpoint():
+async def get_all_spiritual_content_endpoint(request: Request, response: Response, page: PageParams = Depends(page_params("spiritual_content"))):
     """Get all spiritual content (public)"""
-    return await get_all_spiritual_content()
+    if wants_ndjson(request):
+        return ndjson_response(iter_all_spiritual_content(page))
+    unchanged = check_collection_not_modified(request, response, "spiritual_content")
+    if unchanged:
+        return unchanged
+    contents = await get_all_spiritual_content(page)
+    set_next_cursor(response, contents)
+    return model_response(contents.items, SpiritualContent, response)
 
 @api_router.get("/spiritual-content/category/{category}", response_model=List[SpiritualContent])
-async def get_spiritual_content_by_category_endpoint(category: str):
+async def get_spiritual_content_by_category_endpoint(category: str, request: Request, response: Response):
     """Get spiritual content by category (public)"""
-    return await get_spiritual_content_by_category(category)
+    unchanged = check_collection_not_modified(request, response, "spiritual_content")
+    if unchanged:
+        return unchanged
+    return model_response(await get_spiritual_content_by_category(category), SpiritualContent, response)
 
 @api_router.post("/spiritual-content", response_model=SpiritualContent)
-async def create_spiritual_content_endpoint(content_data: SpiritualContentCreate, current_user: User = Depends(get_current_admin)):
+async def create_spiritual_content_endpoint(content_data: SpiritualContentCreate, current_user: Principal = Depends(get_current_admin)):
     """Create new spiritual content (admin only)"""
     return await create_spiritual_content(content_data)
 
 @api_router.put("/spiritual-content/{content_id}", response_model=SpiritualContent)
-async def update_spiritual_content_endpoint(content_id: str, content_data: SpiritualContentUpdate, current_user: User = Depends(get_current_admin)):
+async def update_spiritual_content_endpoint(content_id: str, content_data: SpiritualContentUpdate, current_user: Principal = Depends(get_current_admin)):
     """Update spiritual content (admin only)"""
     content = await update_spiritual_content(content_id, content_data)
     if not content:
@@ -283,7 +407,7 @@ async def update_spiritual_content_endpoint(content_id: str, content_data: Spiri
     return content
 
 @api_router.delete("/spiritual-content/{content_id}")
-async def delete_spiritual_content_endpoint(content_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_spiritual_content_endpoint(content_id: str, current_user: Principal = Depends(get_current_admin)):
     """Delete spiritual content (admin only)"""
     success = await delete_spiritual_content(content_id)
     if not success:
@@ -295,20 +419,26 @@ async def delete_spiritual_content_endpoint(content_id: str, current_user: User
 
 # User management endpoints
 @api_router.get("/users", response_model=List[UserResponse])
-async def get_all_users(current_user: User = Depends(get_current_admin)):
+async def get_all_users(request: Request, response: Response, page: PageParams = Depends(page_params("users")),
+                        current_user: Principal = Depends(get_current_admin)):
     """Get all users (admin only)"""
-    users = await get_all_users_from_db()
-    return [UserResponse(
-        id=user.id,
-        email=user.email,
-        name=user.name,
-        role=user.role,
-        group_id=user.group_id,
-        created_at=user.created_at
-    ) for user in users]
+    if wants_ndjson(request):
+        return ndjson_response(iter_all_users(UserResponse, page))
+    unchanged = check_collection_not_modified(request, response, "users")
+    if unchanged:
+        return unchanged
+    users = await get_all_users_from_db(UserResponse, page)
+    set_next_cursor(response, users)
+    return model_response(users.items, UserResponse, response)
+
+@api_router.post("/users/bulk", response_model=BulkImportReport)
+async def bulk_import_users(request: Request, group_id: Optional[str] = None, current_user: Principal = Depends(get_current_admin)):
+    """Register many users from a CSV or JSON upload (admin only)"""
+    rows = parse_rows(request.headers.get("content-type", ""), await request.body())
+    return await import_users(rows, group_id)
 
 @api_router.get("/users/group/{group_id}", response_model=List[UserResponse])
-async def get_users_by_group(group_id: str, current_user: User = Depends(get_current_user)):
+async def get_users_by_group(group_id: str, response: Response, current_user: Principal = Depends(get_current_principal)):
     """Get users in specific group"""
     # Pilgrims can only access their own group
     if current_user.role == UserRole.PILGRIM and current_user.group_id != group_id:
@@ -317,18 +447,10 @@ async def get_users_by_group(group_id: str, current_user: User = Depends(get_cur
             detail="Not authorized to access this group"
         )
     
-    users = await get_users_by_group_id(group_id)
-    return [UserResponse(
-        id=user.id,
-        email=user.email,
-        name=user.name,
-        role=user.role,
-        group_id=user.group_id,
-        created_at=user.created_at
-    ) for user in users]
+    return model_response(await get_users_by_group_id(group_id, UserResponse), UserResponse, response)
 
 @api_router.put("/users/{user_id}", response_model=UserResponse)
-async def update_user_endpoint(user_id: str, user_data: UserUpdate, current_user: User = Depends(get_current_admin)):
+async def update_user_endpoint(user_id: str, user_data: UserUpdate, current_user: Principal = Depends(get_current_admin)):
     """Update user (admin only)"""
     # Check if user exists
     user_to_update = await get_user_by_id(user_id)
@@ -355,8 +477,9 @@ async def update_user_endpoint(user_id: str, user_data: UserUpdate, current_user
         update_data["email"] = user_data.email
     
     if user_data.password is not None:
-        from .auth import get_password_hash
-        update_data["password_hash"] = get_password_hash(user_data.password)
+        update_data["password_hash"] = await get_password_hash_async(user_data.password)
+        # Sessions opened with the old password end with it
+        update_data["token_version"] = user_to_update.token_version + 1
     
     # Handle group changes
     old_group_id = user_to_update.group_id
@@ -368,7 +491,8 @@ async def update_user_endpoint(user_id: str, user_data: UserUpdate, current_user
             try:
                 await remove_pilgrim_from_group(old_group_id, user_id)
             except Exception as e:
-                print(f"Warning: Could not remove pilgrim from old group: {e}")
+                logger.warning("Could not remove pilgrim from old group",
+                               extra={"user_id": user_id, "group_id": old_group_id, "error": str(e)})
         
         # Add to new group if specified
         if new_group_id and user_to_update.role == UserRole.PILGRIM:
@@ -380,12 +504,23 @@ async def update_user_endpoint(user_id: str, user_data: UserUpdate, current_user
                 )
                 await add_pilgrim_to_group(new_group_id, pilgrim_info)
             except Exception as e:
-                print(f"Warning: Could not add pilgrim to new group: {e}")
+                logger.warning("Could not add pilgrim to new group",
+                               extra={"user_id": user_id, "group_id": new_group_id, "error": str(e)})
         
         update_data["group_id"] = new_group_id
     
+    # Tokens embed email and group_id; make the ones issued before this change invalid
+    if "group_id" in update_data or update_data.get("email", user_to_update.email) != user_to_update.email:
+        update_data["token_version"] = user_to_update.token_version + 1
+    
     # Update user
     updated_user = await update_user(user_id, update_data)
+    invalidate_principal(user_id)
+    if "token_version" in update_data:
+        # Only once the new version is stored: a login racing this update
+        # could otherwise still be issued a token with the old one
+        await revoke_user_tokens(user_id, update_data["token_version"])
+        await delete_refresh_tokens_for_user(user_id)
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -402,7 +537,7 @@ async def update_user_endpoint(user_id: str, user_data: UserUpdate, current_user
     )
 
 @api_router.delete("/users/{user_id}")
-async def delete_user_endpoint(user_id: str, current_user: User = Depends(get_current_admin)):
+async def delete_user_endpoint(user_id: str, current_user: Principal = Depends(get_current_admin)):
     """Delete user (admin only)"""
     # Check if user exists
     user_to_delete = await get_user_by_id(user_id)
@@ -425,10 +560,13 @@ async def delete_user_endpoint(user_id: str, current_user: User = Depends(get_cu
             await remove_pilgrim_from_group(user_to_delete.group_id, user_to_delete.id)
         except Exception as e:
             # Log error but don't fail the deletion
-            print(f"Warning: Could not remove pilgrim from group: {e}")
+            logger.warning("Could not remove pilgrim from group",
+                           extra={"user_id": user_to_delete.id, "group_id": user_to_delete.group_id, "error": str(e)})
     
     # Delete the user
     success = await delete_user(user_id)
+    await revoke_user_tokens(user_id, user_to_delete.token_version + 1)
+    await delete_refresh_tokens_for_user(user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -445,23 +583,47 @@ async def root():
 # Health check endpoint
 @api_router.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "API is running"}
+    # Polled by probes: report the last index check rather than querying MongoDB
+    return {"status": "healthy", "message": "API is running", "indexes": {"status": index_status()}}
+
+# Runtime metrics (admin only)
+@api_router.get("/metrics")
+async def metrics(current_user: Principal = Depends(get_current_admin)):
+    try:
+        index_drift = await cached_index_drift()
+    except Exception as e:
+        index_drift = {"error": str(e)}
+    return {
+        "caches": cache_stats(),
+        "login_rejections": {"ip": login_ip_limiter.rejected, "account": login_account_limiter.rejected},
+        "revocations": revocation_list.stats(),
+        "single_flight": flight_stats(),
+        "collection_versions": version_stats(),
+        "index_drift": index_drift,
+    }
 
 # Include the router in the main app
 app.include_router(api_router)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Sacred Journey API...")
+    # Build missing indexes while the rest of startup runs; only seeding waits on them
+    app.state.index_task = asyncio.create_task(ensure_indexes())
+    # Load revocations before serving, or a restart would accept revoked tokens for a while
+    try:
+        await refresh_revocations()
+    except Exception as e:
+        logger.error(f"Could not load token revocations: {str(e)}")
+    app.state.revocation_task = asyncio.create_task(refresh_revocations_forever())
+    app.state.bcrypt_rounds = await asyncio.get_running_loop().run_in_executor(None, calibrate_bcrypt_rounds)
+    logger.info(f"Using bcrypt work factor {app.state.bcrypt_rounds}")
+    start_hash_pool(app.state.bcrypt_rounds)
     try:
+        # The seed relies on id_unique to stay idempotent across workers starting together
+        await app.state.index_task
         await initialize_database()
         logger.info("Database initialized successfully")
     except Exception as e:
@@ -471,4 +633,6 @@ async def startup_event():
 async def shutdown_event():
     logger.info("Shutting down Sacred Journey API...")
     if client:
-        client.close()
\ No newline at end of file
+        client.close()
+    stop_hash_pool()
+    stop_logging()
\ No newline at end of file
@@ -0,0 +1,60 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import functools
+
+# Every single-flight group registers itself here so /api/metrics can report on it
+FLIGHTS: Dict[str, "SingleFlight"] = {}
+
+class SingleFlight:
+    """Concurrent callers asking for the same key await one shared call"""
+
+    def __init__(self, name: str, collection_name: str):
+        self.name = name
+        self.collection_name = collection_name
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        FLIGHTS[name] = self
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def forget_all(self) -> None:
+        """Make later callers start a fresh call instead of joining one begun before a write"""
+        self._inflight.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+def single_flight(collection_name: str):
+    """Coalesce concurrent calls of a database read function with equal arguments"""
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        flight = SingleFlight(func.__name__, collection_name)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = args + tuple(sorted(kwargs.items()))
+            return await flight.do(key, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def forget_inflight(collection_name: str) -> None:
+    for flight in FLIGHTS.values():
+        if flight.collection_name == collection_name:
+            flight.forget_all()
+
+def flight_stats() -> Dict[str, Dict[str, int]]:
+    return {name: flight.stats() for name, flight in FLIGHTS.items()}
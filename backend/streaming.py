@@ -0,0 +1,30 @@
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import AsyncIterator
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Lines are buffered up to this size before each write to the socket
+NDJSON_CHUNK_SIZE = 64 * 1024
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def _ndjson_chunks(items: AsyncIterator[BaseModel]) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    first = True
+    async for item in items:
+        buffer += item.model_dump_json(by_alias=True).encode()
+        buffer += b"\n"
+        # Send the first line straight away, then write in larger chunks
+        if first or len(buffer) >= NDJSON_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+            first = False
+    if buffer:
+        yield bytes(buffer)
+
+def ndjson_response(items: AsyncIterator[BaseModel]) -> StreamingResponse:
+    """Stream models as newline-delimited JSON, one object per line"""
+    return StreamingResponse(_ndjson_chunks(items), media_type=NDJSON_MEDIA_TYPE)
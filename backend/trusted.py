@@ -0,0 +1,92 @@
+from enum import Enum
+from functools import lru_cache
+from pydantic import BaseModel
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar, Union, get_args, get_origin
+import os
+
+from .models import SCHEMA_VERSION
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Build models from documents stamped with the current SCHEMA_VERSION without
+# validating them again. Only safe while nothing but this service writes to the
+# database, hence opt-in.
+TRUSTED_READS = os.environ.get("TRUSTED_READS", "false").lower() == "true"
+
+Converter = Optional[Callable[[Any], Any]]
+
+_MISSING = object()
+
+def _converter(annotation: Any) -> Converter:
+    """How to turn a stored value into what `annotation` expects, or None to keep it as is"""
+    origin = get_origin(annotation)
+    if origin is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            raise TypeError(f"Cannot construct {annotation} without validation")
+        convert = _converter(args[0])
+        return (lambda value: None if value is None else convert(value)) if convert else None
+    if origin in (list, List):
+        convert = _converter(get_args(annotation)[0])
+        return (lambda values: [convert(value) for value in values]) if convert else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return lambda value: construct_trusted(annotation, value)
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return annotation
+    return None
+
+def _has_python_validators(schema: Any) -> bool:
+    if isinstance(schema, dict):
+        schema_type = schema.get("type")
+        if isinstance(schema_type, str) and schema_type.startswith("function-"):
+            return True
+        return any(_has_python_validators(value) for value in schema.values())
+    if isinstance(schema, (list, tuple)):
+        return any(_has_python_validators(value) for value in schema)
+    return False
+
+@lru_cache(maxsize=None)
+def _worth_constructing(model: Type[BaseModel]) -> bool:
+    """Whether skipping validation pays off for `model`.
+
+    Validation that stays inside pydantic-core (strings, datetimes, nested
+    models) is as fast as constructing in Python; only models whose schema
+    calls back into Python, like EmailStr checking, gain from it.
+    """
+    return _has_python_validators(model.__pydantic_core_schema__)
+
+@lru_cache(maxsize=None)
+def _construct_plan(model: Type[BaseModel]) -> Tuple[Tuple[str, str, Converter], ...]:
+    return tuple(
+        (name, field.alias or name, _converter(field.annotation))
+        for name, field in model.model_fields.items()
+    )
+
+def construct_trusted(model: Type[ModelT], data: Dict[str, Any]) -> ModelT:
+    """Build `model` and its nested models from stored data without validating it"""
+    plan = _construct_plan(model)
+    values = {}
+    for name, key, convert in plan:
+        value = data.get(key, _MISSING)
+        if value is _MISSING:
+            value = data.get(name, _MISSING)
+            if value is _MISSING:
+                continue
+        values[name] = convert(value) if convert is not None and value is not None else value
+    if len(values) < len(plan):
+        # model_construct fills in defaults for fields the document lacks
+        return model.model_construct(**values)
+    # Every field is present: set the instance state directly, as model_construct would
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+def load_model(model: Type[ModelT], document: Dict[str, Any]) -> ModelT:
+    """Model for a stored document: constructed directly when it is trusted, validated otherwise"""
+    if TRUSTED_READS and _worth_constructing(model) and document.get("schema_version") == SCHEMA_VERSION:
+        return construct_trusted(model, document)
+    # Legacy and unversioned documents still get full validation
+    return model.model_validate(document)
@@ -0,0 +1,20 @@
+from typing import Dict
+import secrets
+
+# Random per process, so a version number handed out by one process (or by
+# this one before a restart) can never match a counter it did not come from
+BOOT_ID = secrets.token_hex(4)
+
+# Per-collection write counters, bumped by every write in database.py
+_versions: Dict[str, int] = {}
+
+def bump_collection_version(collection_name: str) -> int:
+    version = _versions.get(collection_name, 0) + 1
+    _versions[collection_name] = version
+    return version
+
+def collection_version(collection_name: str) -> int:
+    return _versions.get(collection_name, 0)
+
+def version_stats() -> Dict[str, int]:
+    return dict(_versions)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare the cost of serialising /api/users and /api/itineraries responses
+through FastAPI's response_model path (validation + jsonable_encoder +
+JSONResponse) against the orjson fast path in backend/responses.py.
+
+Runs without a database: the payloads are built in memory.
+
+    python benchmark_serialization.py [--users 500] [--itineraries 100] [--repeat 20]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from backend.models import Itinerary, UserResponse, UserRole
+from backend.responses import model_response
+
+def build_users(count: int) -> List[UserResponse]:
+    return [
+        UserResponse(
+            id=f"user_{i}",
+            email=f"pilgrim{i}@example.com",
+            name=f"Peregrino {i}",
+            role=UserRole.PILGRIM,
+            group_id="group_001",
+            created_at=datetime.utcnow(),
+        )
+        for i in range(count)
+    ]
+
+def build_itineraries(count: int, days: int = 12) -> List[Itinerary]:
+    flight = {"from": "Madrid", "to": "Tel Aviv", "date": "2025-03-01", "time": "10:00",
+              "airline": "Iberia", "flight_number": "IB3100"}
+    return [
+        Itinerary.model_validate({
+            "id": f"itinerary_{i}",
+            "group_id": f"group_{i}",
+            "group_name": f"Grupo {i}",
+            "flights": {"departure": flight, "return": flight},
+            "included": ["Vuelos", "Hoteles", "Guía espiritual"],
+            "not_included": ["Propinas"],
+            "daily_schedule": [
+                {
+                    "day": day,
+                    "date": f"2025-03-{day:02d}",
+                    "title": f"Día {day}: Jerusalén",
+                    "activities": ["Misa en el Santo Sepulcro", "Vía Dolorosa", "Monte de los Olivos"],
+                    "biblical_quote": "Yo soy el camino, la verdad y la vida (Juan 14,6)",
+                    "accommodation": "Hotel en Jerusalén",
+                }
+                for day in range(1, days + 1)
+            ],
+        })
+        for i in range(count)
+    ]
+
+async def response_model_path(items, model) -> bytes:
+    field = create_response_field(name="Response", type_=List[model])
+    content = await serialize_response(field=field, response_content=items)
+    return JSONResponse(content).body
+
+async def fast_path(items, model) -> bytes:
+    return model_response(items, model, Response()).body
+
+async def timed(label: str, func, items, model, repeat: int) -> float:
+    await func(items, model)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = await func(items, model)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<22} {elapsed:8.2f} ms/response  ({len(body):,} bytes)")
+    return elapsed
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--itineraries", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for route, items, model in [
+        ("/api/users", build_users(args.users), UserResponse),
+        ("/api/itineraries", build_itineraries(args.itineraries), Itinerary),
+    ]:
+        print(f"{route} ({len(items)} items)")
+        before = await timed("response_model path", response_model_path, items, model, args.repeat)
+        after = await timed("orjson fast path", fast_path, items, model, args.repeat)
+        print(f"  speedup: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
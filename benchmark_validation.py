@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for building models from stored documents, as database.py
+list reads do: the old v1 shim (`parse_obj`), `model_validate`, and trusted
+construction (TRUSTED_READS), one document at a time.
+
+Runs without a database: the documents are built in memory.
+
+    python benchmark_validation.py [--itineraries 200] [--days 30] [--users 2000] [--repeat 10]
+"""
+import argparse
+import time
+import warnings
+
+from benchmark_serialization import build_itineraries
+from backend.database import _to_document
+from backend.models import Itinerary, User, UserRole
+from backend.trusted import construct_trusted
+
+def timed(label: str, func, docs, repeat: int) -> float:
+    func(docs)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(docs)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<30} {elapsed:8.2f} ms")
+    return elapsed
+
+def compare(title: str, model, docs, repeat: int):
+    print(title)
+    baseline = timed("parse_obj", lambda docs: [model.parse_obj(doc) for doc in docs], docs, repeat)
+    candidates = [
+        ("model_validate", lambda docs: [model.model_validate(doc) for doc in docs]),
+        ("trusted construction", lambda docs: [construct_trusted(model, doc) for doc in docs]),
+    ]
+    for label, func in candidates:
+        elapsed = timed(label, func, docs, repeat)
+        print(f"  {'':<30} {baseline / elapsed:8.1f}x vs parse_obj")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--itineraries", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # The shim warns on every call; keep that out of the output but not out of the timing
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    itineraries = [_to_document(itinerary, by_alias=True) for itinerary in build_itineraries(args.itineraries, args.days)]
+    compare(f"{len(itineraries)} itineraries x {args.days} days", Itinerary, itineraries, args.repeat)
+
+    users = [
+        _to_document(User(email=f"pilgrim{i}@example.com", password_hash="x", name=f"Peregrino {i}", role=UserRole.PILGRIM))
+        for i in range(args.users)
+    ]
+    compare(f"{len(users)} users", User, users, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ const api = axios.create({
 
 // Token management
 const TOKEN_KEY = 'token'; // Cambiar para que coincida con el frontend
+const REFRESH_TOKEN_KEY = 'refresh_token';
 
 export const tokenManager = {
   getToken: () => localStorage.getItem(TOKEN_KEY) || localStorage.getItem('pilgrimage_token'),
@@ -20,12 +21,34 @@ export const tokenManager = {
     localStorage.setItem(TOKEN_KEY, token);
     localStorage.setItem('pilgrimage_token', token); // Mantener ambos por compatibilidad
   },
+  getRefreshToken: () => localStorage.getItem(REFRESH_TOKEN_KEY),
+  setRefreshToken: (token) => localStorage.setItem(REFRESH_TOKEN_KEY, token),
   removeToken: () => {
     localStorage.removeItem(TOKEN_KEY);
     localStorage.removeItem('pilgrimage_token');
+    localStorage.removeItem(REFRESH_TOKEN_KEY);
   },
 };
 
+// Concurrent 401s share a single refresh request
+let refreshPromise = null;
+
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    refreshPromise = axios
+      .post(`${API_BASE_URL}/auth/refresh`, { refresh_token: tokenManager.getRefreshToken() })
+      .then((response) => {
+        tokenManager.setToken(response.data.access_token);
+        tokenManager.setRefreshToken(response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
 // Request interceptor to add token to requests
 api.interceptors.request.use(
   (config) => {
@@ -43,8 +66,20 @@ api.interceptors.request.use(
 // Response interceptor to handle token expiration
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const originalRequest = error.config;
     if (error.response?.status === 401) {
+      // Renew an expired access token once before sending the user back to login
+      if (tokenManager.getRefreshToken() && originalRequest && !originalRequest._retried) {
+        originalRequest._retried = true;
+        try {
+          const accessToken = await refreshAccessToken();
+          originalRequest.headers.Authorization = `Bearer ${accessToken}`;
+          return api(originalRequest);
+        } catch (refreshError) {
+          // Fall through to logout
+        }
+      }
       tokenManager.removeToken();
       window.location.href = '/';
     }
@@ -64,6 +99,9 @@ export const authAPI = {
     if (response.data.access_token) {
       tokenManager.setToken(response.data.access_token);
     }
+    if (response.data.refresh_token) {
+      tokenManager.setRefreshToken(response.data.refresh_token);
+    }
     return response.data;
   },
 
@@ -72,8 +110,22 @@ export const authAPI = {
     return response.data;
   },
 
-  logout: () => {
-    tokenManager.removeToken();
+  logout: async () => {
+    const token = tokenManager.getToken();
+    try {
+      // Revoke the session server-side; plain axios so a 401 here does not trigger a refresh
+      if (token) {
+        await axios.post(
+          `${API_BASE_URL}/auth/logout`,
+          { refresh_token: tokenManager.getRefreshToken() },
+          { headers: { Authorization: `Bearer ${token}` } }
+        );
+      }
+    } catch (error) {
+      // Already expired or revoked: clearing local storage is all that is left
+    } finally {
+      tokenManager.removeToken();
+    }
   },
 };
 
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend import bulk_import
+from backend.bulk_import import import_users, parse_rows
+
+
+@pytest.fixture
+def inserted(monkeypatch):
+    """Stand-ins for the database and hashing work behind import_users"""
+    users = []
+
+    async def get_existing_emails(emails):
+        return set()
+
+    async def hash_passwords(passwords):
+        return [f"hash:{password}" for password in passwords]
+
+    async def create_users_bulk(new_users):
+        users.extend(new_users)
+        return {}
+
+    async def add_pilgrims_to_group(group_id, pilgrims):
+        pass
+
+    monkeypatch.setattr(bulk_import, "get_existing_emails", get_existing_emails)
+    monkeypatch.setattr(bulk_import, "hash_passwords", hash_passwords)
+    monkeypatch.setattr(bulk_import, "create_users_bulk", create_users_bulk)
+    monkeypatch.setattr(bulk_import, "add_pilgrims_to_group", add_pilgrims_to_group)
+    return users
+
+
+def test_malformed_json_rows_are_reported_as_invalid(inserted):
+    body = b"""[
+        {"email": "maria@example.com", "password": "secret", "name": "Maria"},
+        {"email": 5, "password": "secret", "name": "Number"},
+        {"email": ["a@example.com"], "password": "secret", "name": "List"},
+        {"email": {"address": "b@example.com"}, "password": "secret", "name": "Object"},
+        {"email": "not-an-email", "password": "secret", "name": "Typo"},
+        {"email": "jose@example.com", "name": "No password"}
+    ]"""
+    report = asyncio.run(import_users(parse_rows("application/json", body)))
+    assert report.total == 6 and report.created == 1 and report.failed == 5
+    assert [row.status for row in report.rows] == ["created"] + ["invalid"] * 5
+    assert [row.email for row in report.rows[1:4]] == [None, None, None]
+    assert all(row.error for row in report.rows[1:])
+    assert [user.email for user in inserted] == ["maria@example.com"]
+
+
+def test_malformed_csv_rows_are_reported_as_invalid(inserted):
+    body = (
+        "email,password,name\n"
+        "maria@example.com,secret,Maria\n"
+        "not-an-email,secret,Typo\n"
+        "jose@example.com,,No password\n"
+        "short-row@example.com\n"
+        "extra@example.com,secret,Extra,unexpected,cells\n"
+    ).encode()
+    report = asyncio.run(import_users(parse_rows("text/csv", body)))
+    assert [row.status for row in report.rows] == ["created", "invalid", "invalid", "invalid", "created"]
+    assert [user.email for user in inserted] == ["maria@example.com", "extra@example.com"]
+
+
+@pytest.mark.parametrize("content_type, body", [
+    ("application/json", b"{not json"),
+    ("application/json", b'{"email": "maria@example.com"}'),
+    ("application/json", b'["maria@example.com"]'),
+    ("text/csv", b"\xff\xfe\x00garbage"),
+])
+def test_unparseable_files_are_rejected(content_type, body):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_rows(content_type, body)
+    assert exc_info.value.status_code == 400
@@ -0,0 +1,39 @@
+from fastapi import Response
+from starlette.requests import Request
+
+from backend import conditional
+from backend.conditional import check_collection_not_modified, collection_etag
+from backend.versions import bump_collection_version
+
+
+def make_request(if_none_match=None, query=""):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/api/groups",
+                    "query_string": query.encode(), "headers": headers})
+
+
+def test_unchanged_collection_is_not_modified():
+    etag = collection_etag("groups", make_request())
+    response = check_collection_not_modified(make_request(etag), Response(), "groups")
+    assert response is not None and response.status_code == 304
+
+
+def test_write_changes_etag():
+    etag = collection_etag("groups", make_request())
+    bump_collection_version("groups")
+    response = Response()
+    assert check_collection_not_modified(make_request(etag), response, "groups") is None
+    assert response.headers["ETag"] != etag
+
+
+def test_query_changes_etag():
+    assert collection_etag("groups", make_request()) != collection_etag("groups", make_request(query="limit=5"))
+
+
+def test_etag_expires_after_ttl(monkeypatch):
+    # Writes made by other workers never bump this process's counter
+    now = [1_000_000.0]
+    monkeypatch.setattr(conditional.time, "time", lambda: now[0])
+    etag = collection_etag("groups", make_request())
+    now[0] += conditional.COLLECTION_ETAG_TTL
+    assert collection_etag("groups", make_request()) != etag
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import indexes, server
+from backend.auth import access_token_claims, create_access_token
+from backend.models import User, UserRole
+
+
+@pytest.fixture
+def drift_checks(monkeypatch):
+    """Count the drift reports taken instead of asking MongoDB"""
+    checks = []
+
+    async def get_index_drift():
+        checks.append(1)
+        return {"itineraries": {"unexpected": ["group_id"]}}
+
+    monkeypatch.setattr(indexes, "get_index_drift", get_index_drift)
+    monkeypatch.setattr(indexes, "_last_drift", None)
+    monkeypatch.setattr(indexes, "_last_drift_at", float("-inf"))
+    return checks
+
+
+def admin_headers():
+    admin = User(email="admin@example.com", password_hash="unused", name="Admin", role=UserRole.ADMIN)
+    token = create_access_token(access_token_claims(admin), expires_delta=timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_mismatched_ttl_is_reported(monkeypatch):
+    async def existing(collection_name):
+        declared = {key: dict(spec) for key, spec in indexes._declared(collection_name).items()}
+        for spec in declared.values():
+            spec.pop("expireAfterSeconds", None)
+        return declared
+
+    monkeypatch.setattr(indexes, "_existing", existing)
+    drift = asyncio.run(indexes.get_index_drift())
+    assert drift == {
+        "refresh_tokens": {"mismatched": ["expires_at_ttl"]},
+        "revoked_tokens": {"mismatched": ["expires_at_ttl"]},
+    }
+
+
+def test_health_never_queries_indexes(drift_checks):
+    client = TestClient(server.app)
+    assert client.get("/api/health").json()["indexes"] == {"status": "unknown"}
+    assert drift_checks == []
+
+
+def test_metrics_reuses_the_drift_report(drift_checks):
+    client = TestClient(server.app)
+    for _ in range(3):
+        response = client.get("/api/metrics", headers=admin_headers())
+        assert response.json()["index_drift"] == {"itineraries": {"unexpected": ["group_id"]}}
+    assert drift_checks == [1]
+    # The health summary follows the last report
+    assert client.get("/api/health").json()["indexes"] == {"status": "drift"}
@@ -0,0 +1,137 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from backend import ratelimit, server
+from backend.models import User, UserRole
+from backend.ratelimit import TokenBucketLimiter, client_ip
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_request(client=("203.0.113.7", 51234), headers=()):
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/auth/login",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+        "client": client,
+    }
+    return Request(scope)
+
+
+def test_bucket_allows_capacity_then_rejects(clock):
+    limiter = TokenBucketLimiter(capacity=3, window=60)
+    assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a") == pytest.approx(20)
+    assert limiter.rejected == 1
+
+
+def test_bucket_refills_over_window(clock):
+    limiter = TokenBucketLimiter(capacity=3, window=60)
+    for _ in range(3):
+        limiter.acquire("a")
+    clock[0] += 20
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") > 0
+
+
+def test_keys_are_independent(clock):
+    limiter = TokenBucketLimiter(capacity=1, window=60)
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("b") == 0
+    assert limiter.acquire("a") > 0
+
+
+def test_check_raises_429_with_retry_after(clock):
+    limiter = TokenBucketLimiter(capacity=1, window=60)
+    limiter.check("a")
+    with pytest.raises(HTTPException) as exc_info:
+        limiter.check("a")
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"] == "60"
+
+
+def test_refund_gives_back_a_token(clock):
+    limiter = TokenBucketLimiter(capacity=2, window=60)
+    # Successful attempts take a token and return it
+    for _ in range(10):
+        limiter.check("a")
+        limiter.refund("a")
+    # Failed attempts are the ones that count
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(HTTPException):
+        limiter.check("a")
+    assert limiter.rejected == 1
+
+
+def test_refund_never_exceeds_capacity(clock):
+    limiter = TokenBucketLimiter(capacity=1, window=60)
+    limiter.acquire("a")
+    limiter.refund("a")
+    limiter.refund("a")
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") > 0
+
+
+def test_least_recently_seen_keys_are_forgotten(clock):
+    limiter = TokenBucketLimiter(capacity=1, window=60, max_keys=2)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("c")
+    # "a" was evicted and starts over with a full bucket
+    assert limiter.acquire("a") == 0
+
+
+def test_client_ip_uses_connection_address():
+    assert client_ip(make_request()) == "203.0.113.7"
+
+
+def test_client_ip_ignores_forwarded_for_header():
+    # Proxy headers are resolved by uvicorn (--proxy-headers) into the client
+    # address; a header sent by the client itself must not be trusted
+    request = make_request(headers=[("X-Forwarded-For", "198.51.100.1")])
+    assert client_ip(request) == "203.0.113.7"
+
+
+def test_client_ip_without_client():
+    assert client_ip(make_request(client=None)) == "unknown"
+
+
+def test_concurrent_logins_beyond_capacity_are_rejected_before_hashing(monkeypatch):
+    monkeypatch.setattr(server, "login_ip_limiter", TokenBucketLimiter(capacity=3, window=60))
+    verifying = []
+
+    async def get_user_by_email(email):
+        return User(email=email, password_hash="unused", name="Peregrino", role=UserRole.PILGRIM)
+
+    async def verify_password_async(plain_password, hashed_password):
+        verifying.append(plain_password)
+        # Stay busy, so every attempt has been let in or turned away before any fails
+        await asyncio.sleep(0.05)
+        return False
+
+    monkeypatch.setattr(server, "get_user_by_email", get_user_by_email)
+    monkeypatch.setattr(server, "verify_password_async", verify_password_async)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=server.app, client=("203.0.113.7", 51234))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # A different account each time, so only the address limit applies
+            return await asyncio.gather(*(
+                client.post("/api/auth/login", json={"email": f"pilgrim{i}@example.com", "password": "guess"})
+                for i in range(10)
+            ))
+
+    statuses = sorted(response.status_code for response in asyncio.run(burst()))
+    assert statuses == [401] * 3 + [429] * 7
+    assert len(verifying) == 3
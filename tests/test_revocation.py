@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import auth, database, revocation, server
+from backend.auth import access_token_claims, create_access_token, get_password_hash
+from backend.models import TokenData, User, UserRole
+from backend.revocation import RevocationList
+
+
+@pytest.fixture
+def revocations(monkeypatch):
+    revocations = RevocationList()
+    monkeypatch.setattr(revocation, "revocation_list", revocations)
+    monkeypatch.setattr(auth, "revocation_list", revocations)
+    return revocations
+
+
+@pytest.fixture
+def users(monkeypatch, revocations):
+    """In-memory users collection behind the database functions the auth endpoints use"""
+    store = {}
+    calls = []
+
+    async def get_user_by_email(email):
+        return next((user for user in store.values() if user.email == email), None)
+
+    async def get_user_by_id(user_id):
+        return store.get(user_id)
+
+    async def update_user(user_id, update_data):
+        calls.append("update_user")
+        store[user_id] = store[user_id].model_copy(update=update_data)
+        return store[user_id]
+
+    async def create_refresh_token(token_hash, user_id, claims, expires_at):
+        pass
+
+    async def delete_refresh_tokens_for_user(user_id):
+        calls.append("delete_refresh_tokens")
+
+    async def add_revocation(doc):
+        calls.append("add_revocation")
+
+    for module in (server, database):
+        monkeypatch.setattr(module, "get_user_by_email", get_user_by_email)
+    monkeypatch.setattr(server, "get_user_by_id", get_user_by_id)
+    monkeypatch.setattr(server, "update_user", update_user)
+    monkeypatch.setattr(server, "create_refresh_token", create_refresh_token)
+    monkeypatch.setattr(server, "delete_refresh_tokens_for_user", delete_refresh_tokens_for_user)
+    monkeypatch.setattr(database, "add_revocation", add_revocation)
+    return store, calls
+
+
+def add_user(store, role, email, password):
+    user = User(email=email, password_hash=get_password_hash(password), name=email, role=role)
+    store[user.id] = user
+    return user
+
+
+def bearer(user):
+    token = create_access_token(access_token_claims(user), expires_delta=timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_user_version_floor_rejects_older_tokens_only(revocations):
+    revocations.add_user("u1", 1)
+    assert revocations.is_revoked(TokenData(user_id="u1", token_version=0))
+    assert not revocations.is_revoked(TokenData(user_id="u1", token_version=1))
+    # Tokens from before versions were embedded count as version 0
+    assert revocations.is_revoked(TokenData(user_id="u1", token_version=None))
+    assert not revocations.is_revoked(TokenData(user_id="u2", token_version=0))
+
+
+def test_reload_keeps_local_revocations(revocations):
+    revocations.add_user("u1", 2)
+    revocations.replace(set(), {"u1": 1})
+    assert revocations.is_revoked(TokenData(user_id="u1", token_version=1))
+
+
+def test_password_reset_revokes_old_tokens_but_not_new_logins(users):
+    store, calls = users
+    admin = add_user(store, UserRole.ADMIN, "admin@example.com", "admin-password")
+    pilgrim = add_user(store, UserRole.PILGRIM, "pilgrim@example.com", "old-password")
+    client = TestClient(server.app)
+
+    old_token = bearer(pilgrim)
+    assert client.get("/api/auth/me", headers=old_token).status_code == 200
+
+    response = client.put(f"/api/users/{pilgrim.id}", json={"password": "new-password"}, headers=bearer(admin))
+    assert response.status_code == 200
+    # The revocation is only written once the new hash is stored
+    assert calls.index("update_user") < calls.index("add_revocation")
+
+    # Logging in right away, within the same second, gives a working token
+    response = client.post("/api/auth/login", json={"email": pilgrim.email, "password": "new-password"})
+    assert response.status_code == 200
+    new_token = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert client.get("/api/auth/me", headers=new_token).status_code == 200
+
+    # Tokens from before the reset, including one issued while it was in flight, stay revoked
+    assert client.get("/api/auth/me", headers=old_token).status_code == 401
+    assert client.get("/api/auth/me", headers=bearer(pilgrim)).status_code == 401
+    response = client.post("/api/auth/login", json={"email": pilgrim.email, "password": "old-password"})
+    assert response.status_code == 401
+
+
+def test_group_change_revokes_tokens_through_the_store(users, revocations):
+    store, calls = users
+    admin = add_user(store, UserRole.ADMIN, "admin@example.com", "admin-password")
+    pilgrim = add_user(store, UserRole.PILGRIM, "pilgrim@example.com", "password")
+    client = TestClient(server.app)
+    old_token = bearer(pilgrim)
+
+    response = client.put(f"/api/users/{pilgrim.id}", json={"email": "peregrino@example.com"}, headers=bearer(admin))
+    assert response.status_code == 200
+    # Persisted for the other workers, not only remembered by this one
+    assert calls.index("update_user") < calls.index("add_revocation")
+    assert client.get("/api/auth/me", headers=old_token).status_code == 401
+    assert client.get("/api/auth/me", headers=bearer(store[pilgrim.id])).status_code == 200